@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.deps import get_current_user, require_roles
-from app.models.user import User, UserRole
+from app.core.principal_cache import Principal
+from app.models.user import UserRole
 from app.schemas.analytics import AnalyticsSummary
 from app.repositories.lead_repo import LeadRepository
 from app.repositories.message_repo import MessageRepository
@@ -14,7 +15,7 @@ router = APIRouter(prefix="/analytics", tags=["analytics"])
 @router.get("/summary", response_model=AnalyticsSummary)
 async def get_summary(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     lead_repo = LeadRepository(db)
     msg_repo = MessageRepository(db)
@@ -6,7 +6,7 @@ from app.core.deps import get_current_user
 from app.schemas.auth import LoginRequest, TokenResponse, RefreshRequest
 from app.schemas.user import UserOut
 from app.repositories.user_repo import UserRepository
-from app.models.user import User
+from app.core.principal_cache import Principal
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -42,5 +42,5 @@ async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserOut)
-async def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: Principal = Depends(get_current_user)):
     return current_user
@@ -1,19 +1,25 @@
+from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
 from app.db.session import get_db
 from app.core.deps import get_current_user, require_roles
-from app.models.user import User, UserRole
+from app.core.principal_cache import Principal
+from app.models.user import UserRole
 from app.models.broadcast import Broadcast, BroadcastStatus
 from app.schemas.broadcast import BroadcastOut, BroadcastCreate, BroadcastSchedule
 from app.repositories.broadcast_repo import BroadcastRepository
 
 router = APIRouter(prefix="/broadcasts", tags=["broadcasts"])
+settings = get_settings()
+
+SCHEDULABLE_STATUSES = (BroadcastStatus.DRAFT, BroadcastStatus.SCHEDULED)
 
 
 @router.get("", response_model=list[BroadcastOut])
 async def list_broadcasts(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = BroadcastRepository(db)
     return await repo.get_all()
@@ -23,7 +29,7 @@ async def list_broadcasts(
 async def create_broadcast(
     body: BroadcastCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = BroadcastRepository(db)
     broadcast = Broadcast(
@@ -31,6 +37,7 @@ async def create_broadcast(
         segment=body.segment,
         template_name=body.template_name,
         body=body.body,
+        concurrency=body.concurrency,
         created_by=current_user.id,
     )
     return await repo.create(broadcast)
@@ -41,26 +48,91 @@ async def schedule_broadcast(
     broadcast_id: int,
     body: BroadcastSchedule,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
-    repo = BroadcastRepository(db)
-    broadcast = await repo.get_by_id(broadcast_id)
-    if not broadcast:
-        raise HTTPException(status_code=404, detail="Broadcast not found")
+    from app.workers.tasks import execute_broadcast_task
 
+    # Only a draft or a not yet started scheduled broadcast can be (re)scheduled or started
     if body.scheduled_at:
-        broadcast.scheduled_at = body.scheduled_at
-        broadcast.status = BroadcastStatus.SCHEDULED
-        await repo.update(broadcast)
-        from app.workers.tasks import execute_broadcast_task
+        broadcast = await _transition(
+            db, broadcast_id, SCHEDULABLE_STATUSES, BroadcastStatus.SCHEDULED, scheduled_at=body.scheduled_at,
+        )
+        await db.commit()
+        # The task carries its time, so an ETA task superseded by a reschedule or a resume does nothing
         execute_broadcast_task.apply_async(
-            args=[broadcast.id],
+            args=[broadcast.id, body.scheduled_at.isoformat()],
             eta=body.scheduled_at,
         )
     else:
-        broadcast.status = BroadcastStatus.SENDING
-        await repo.update(broadcast)
-        from app.workers.tasks import execute_broadcast_task
+        broadcast = await _transition(
+            db, broadcast_id, SCHEDULABLE_STATUSES, BroadcastStatus.SENDING, heartbeat_at=datetime.now(timezone.utc),
+        )
+        # The task only runs broadcasts it sees as scheduled or sending
+        await db.commit()
         execute_broadcast_task.delay(broadcast.id)
 
     return broadcast
+
+
+async def _transition(
+    db: AsyncSession, broadcast_id: int, from_statuses: tuple[BroadcastStatus, ...], to: BroadcastStatus, **values,
+) -> Broadcast:
+    repo = BroadcastRepository(db)
+    broadcast = await repo.get_by_id(broadcast_id)
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    if not await repo.transition(broadcast_id, from_statuses, to, **values):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot change a {broadcast.status.value} broadcast to {to.value}",
+        )
+    await db.refresh(broadcast)
+    return broadcast
+
+
+@router.post("/{broadcast_id}/pause", response_model=BroadcastOut)
+async def pause_broadcast(
+    broadcast_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+):
+    # The running task stops after its current write window and keeps its checkpoint
+    return await _transition(db, broadcast_id, (BroadcastStatus.SENDING, BroadcastStatus.SCHEDULED), BroadcastStatus.PAUSED)
+
+
+@router.post("/{broadcast_id}/resume", response_model=BroadcastOut)
+async def resume_broadcast(
+    broadcast_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+):
+    repo = BroadcastRepository(db)
+    broadcast = await repo.get_by_id(broadcast_id)
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    # A sending broadcast is only restarted once its run went quiet, i.e. its worker died
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.BROADCAST_STALE_AFTER_SECONDS)
+    if not await repo.resume(broadcast_id, stale_before):
+        detail = (
+            "Broadcast is still sending" if broadcast.status in (BroadcastStatus.SENDING, BroadcastStatus.PAUSED)
+            else f"Cannot change a {broadcast.status.value} broadcast to sending"
+        )
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+    await db.commit()
+    await db.refresh(broadcast)
+    from app.workers.tasks import execute_broadcast_task
+    execute_broadcast_task.delay(broadcast.id)
+    return broadcast
+
+
+@router.post("/{broadcast_id}/cancel", response_model=BroadcastOut)
+async def cancel_broadcast(
+    broadcast_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+):
+    return await _transition(
+        db, broadcast_id,
+        (BroadcastStatus.DRAFT, BroadcastStatus.SCHEDULED, BroadcastStatus.SENDING, BroadcastStatus.PAUSED),
+        BroadcastStatus.CANCELLED,
+    )
@@ -1,11 +1,14 @@
+import httpx
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.deps import get_current_user
-from app.models.user import User
+from app.core.http import get_http_client
+from app.core.principal_cache import Principal
 from app.schemas.call import CallOut, ClickToCallRequest
-from app.repositories.call_repo import CallRepository
+from app.repositories.call_repo import CallRepository, SPARSE_FIELDS, SPARSE_EXPANSIONS
 from app.services.sipuni_service import SipuniService
+from app.utils.fieldsets import parse_fieldset, json_rows_response
 
 router = APIRouter(prefix="/calls", tags=["calls"])
 
@@ -16,27 +19,30 @@ async def list_calls(
     direction: str | None = None,
     limit: int = Query(100, le=500),
     offset: int = 0,
+    fields: str | None = None,
+    expand: str | None = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     repo = CallRepository(db)
+    field_names = parse_fieldset(fields, SPARSE_FIELDS, "fields")
+    expand_names = parse_fieldset(expand, SPARSE_EXPANSIONS, "expand")
+    if field_names is not None or expand_names is not None:
+        rows = await repo.get_rows(
+            current_user, field_names or list(SPARSE_FIELDS), expand_names,
+            lead_id=lead_id, direction=direction, limit=limit, offset=offset,
+        )
+        return json_rows_response(rows)
     calls = await repo.get_all(current_user, lead_id=lead_id, direction=direction, limit=limit, offset=offset)
-    results = []
-    for c in calls:
-        out = CallOut.model_validate(c)
-        if c.lead:
-            out.lead_name = c.lead.name
-        if c.manager:
-            out.manager_name = c.manager.name
-        results.append(out)
-    return results
+    return [CallOut.from_call(c) for c in calls]
 
 
 @router.post("/click-to-call")
 async def click_to_call(
     body: ClickToCallRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    http: httpx.AsyncClient = Depends(get_http_client),
+    current_user: Principal = Depends(get_current_user),
 ):
-    service = SipuniService(db)
+    service = SipuniService(db, http)
     return await service.click_to_call(body.phone, current_user.id)
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.deps import require_roles
-from app.models.user import User, UserRole
+from app.core.principal_cache import Principal
+from app.models.user import UserRole
 from app.models.distribution import DistributionRule
 from app.schemas.distribution import DistributionRuleOut, DistributionRuleUpdate
 from app.repositories.distribution_repo import DistributionRuleRepository
@@ -13,7 +14,7 @@ router = APIRouter(prefix="/distribution", tags=["distribution"])
 @router.get("/rules", response_model=list[DistributionRuleOut])
 async def get_rules(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = DistributionRuleRepository(db)
     return await repo.get_all()
@@ -23,7 +24,7 @@ async def get_rules(
 async def update_rules(
     rules: list[DistributionRuleUpdate],
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN)),
 ):
     repo = DistributionRuleRepository(db)
     new_rules = [
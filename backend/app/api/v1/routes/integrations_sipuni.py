@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Request, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
 from app.db.session import get_db
+from app.models.webhook import WebhookSource
+from app.repositories.webhook_repo import WebhookInboxRepository
 from app.services.sipuni_service import SipuniService
+from app.services.webhook_inbox_service import webhook_worker
 
 router = APIRouter(prefix="/integrations/sipuni", tags=["integrations"])
+settings = get_settings()
 
 
 @router.post("/webhook")
@@ -12,6 +17,11 @@ async def receive_webhook(
     db: AsyncSession = Depends(get_db),
 ):
     payload = await request.json()
+    if settings.WEBHOOK_INGEST_MODE == "queue":
+        await WebhookInboxRepository(db).enqueue(WebhookSource.SIPUNI, payload)
+        await db.commit()
+        webhook_worker.notify()
+        return {"status": "queued", "call_id": None}
     service = SipuniService(db)
     call = await service.handle_webhook(payload)
     return {"status": "ok", "call_id": call.id if call else None}
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Request, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
+from app.core.config import get_settings
 from app.db.session import get_db
+from app.models.webhook import WebhookSource
+from app.repositories.webhook_repo import WebhookInboxRepository
 from app.services.whatsapp_service import WhatsAppService
+from app.services.webhook_inbox_service import webhook_worker
 
 router = APIRouter(prefix="/integrations/whatsapp", tags=["integrations"])
+settings = get_settings()
 
 
 @router.get("/webhook")
@@ -26,6 +31,11 @@ async def receive_webhook(
     db: AsyncSession = Depends(get_db),
 ):
     payload = await request.json()
+    if settings.WEBHOOK_INGEST_MODE == "queue":
+        await WebhookInboxRepository(db).enqueue(WebhookSource.WHATSAPP, payload)
+        await db.commit()
+        webhook_worker.notify()
+        return {"status": "queued"}
     service = WhatsAppService(db)
     await service.handle_incoming(payload)
     return {"status": "ok"}
@@ -1,41 +1,92 @@
+import asyncio
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
-from app.core.deps import get_current_user
-from app.models.user import User, UserRole
+from app.db.session import get_db, run_in_session
+from app.core.deps import get_current_user, require_roles
+from app.core.principal_cache import Principal
+from app.models.user import UserRole
 from app.models.lead import Lead
 from app.models.activity import Activity, ActivityKind
-from app.schemas.lead import LeadOut, LeadCreate, LeadUpdate
+from app.schemas.lead import (
+    LeadOut, LeadFullOut, LeadCreate, LeadUpdate, LeadBulkUpdate, LeadBulkUpdateResult, LeadImportResult,
+)
 from app.schemas.activity import ActivityOut
-from app.repositories.lead_repo import LeadRepository
+from app.schemas.call import CallOut
+from app.schemas.message import MessageOut
+from app.repositories.lead_repo import LeadRepository, SPARSE_FIELDS, SPARSE_EXPANSIONS, normalize_tag_filter
 from app.repositories.activity_repo import ActivityRepository
 from app.repositories.message_repo import MessageRepository
+from app.repositories.call_repo import CallRepository
 from app.services.distribution_service import DistributionService
+from app.services.lead_import_service import LeadImportService
+from app.services.lead_export_service import stream_lead_export
+from app.utils.cursor import InvalidCursorError
+from app.utils.fieldsets import parse_fieldset, nest_row, json_rows_response
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
 
 @router.get("", response_model=list[LeadOut])
 async def list_leads(
+    response: Response,
     stage_id: int | None = None,
     manager_id: int | None = None,
     source: str | None = None,
+    tags_any: str | None = None,
+    tags_all: str | None = None,
+    tags_none: str | None = None,
     q: str | None = None,
     limit: int = Query(100, le=500),
     offset: int = 0,
+    cursor: str | None = None,
+    fields: str | None = None,
+    expand: str | None = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     repo = LeadRepository(db)
-    return await repo.get_all(current_user, stage_id=stage_id, manager_id=manager_id, source=source, q=q, limit=limit, offset=offset)
+    tags = normalize_tag_filter({"any": tags_any, "all": tags_all, "none": tags_none})
+    field_names = parse_fieldset(fields, SPARSE_FIELDS, "fields")
+    expand_names = parse_fieldset(expand, SPARSE_EXPANSIONS, "expand")
+    sparse = field_names is not None or expand_names is not None
+    # id and updated_at back the cursor, so a sparse query always selects them
+    cursor_fields = ("id", "updated_at")
+    query_fields = list(dict.fromkeys([*(field_names or SPARSE_FIELDS), *cursor_fields]))
+    try:
+        if sparse:
+            leads = await repo.get_rows(
+                current_user, query_fields, expand_names, stage_id=stage_id, manager_id=manager_id,
+                source=source, tags=tags, q=q, limit=limit, offset=offset, cursor=cursor,
+            )
+        else:
+            leads = await repo.get_all(
+                current_user, stage_id=stage_id, manager_id=manager_id, source=source, tags=tags, q=q,
+                limit=limit, offset=offset, cursor=cursor,
+            )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Search results are similarity-ranked, so they only page by offset
+    next_cursor = None if q else repo.next_cursor(leads, limit)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    if sparse:
+        # ...but a row only carries the fields that were asked for
+        unrequested = [name for name in cursor_fields if field_names is not None and name not in field_names]
+        for row in leads:
+            for name in unrequested:
+                del row[name]
+        return json_rows_response([nest_row(row) for row in leads], headers=headers)
+    response.headers.update(headers)
+    return leads
 
 
 @router.post("", response_model=LeadOut, status_code=status.HTTP_201_CREATED)
 async def create_lead(
     body: LeadCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     lead = Lead(
         name=body.name,
@@ -57,7 +108,7 @@ async def create_lead(
             lead.manager_id = manager.id
 
     repo = LeadRepository(db)
-    lead = await repo.create(lead)
+    lead = await repo.create(lead, profile="detail")
 
     activity_repo = ActivityRepository(db)
     await activity_repo.create(Activity(
@@ -73,25 +124,151 @@ async def create_lead(
     return lead
 
 
+@router.post("/import", response_model=LeadImportResult)
+async def import_leads(
+    request: Request,
+    format: str | None = Query(None, pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+):
+    # The body is the raw CSV (with a header row) or NDJSON file, parsed as it streams in
+    fmt = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    service = LeadImportService(db)
+    try:
+        summary = await service.import_stream(request.stream(), fmt, current_user.name)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import file must be UTF-8 encoded")
+
+    from app.api.v1.ws import manager as ws_manager
+    await ws_manager.broadcast_event({
+        "event": "lead:updated",
+        "data": {"action": "imported", "created": summary["created"], "failed": summary["failed"]},
+    })
+
+    return summary
+
+
+@router.get("/export")
+async def export_leads(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    stage_id: int | None = None,
+    manager_id: int | None = None,
+    source: str | None = None,
+    tags_any: str | None = None,
+    tags_all: str | None = None,
+    tags_none: str | None = None,
+    current_user: Principal = Depends(get_current_user),
+):
+    tags = normalize_tag_filter({"any": tags_any, "all": tags_all, "none": tags_none})
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_lead_export(
+            current_user, format, stage_id=stage_id, manager_id=manager_id, source=source, tags=tags,
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="leads.{format}"'},
+    )
+
+
 @router.get("/{lead_id}", response_model=LeadOut)
 async def get_lead(
     lead_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     repo = LeadRepository(db)
-    lead = await repo.check_access(lead_id, current_user)
+    lead = await repo.check_access(lead_id, current_user, profile="detail")
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     return lead
 
 
+@router.get("/{lead_id}/full", response_model=LeadFullOut)
+async def get_lead_full(
+    lead_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    repo = LeadRepository(db)
+    lead = await repo.check_access(lead_id, current_user, profile="detail")
+    if not lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
+
+    # Access is checked once above; the sections then load concurrently on separate connections
+    messages, calls, activities = await asyncio.gather(
+        run_in_session(lambda s: MessageRepository(s).get_by_lead(lead_id, limit=limit)),
+        run_in_session(lambda s: CallRepository(s).get_all(current_user, lead_id=lead_id, limit=limit)),
+        run_in_session(lambda s: ActivityRepository(s).get_by_lead(lead_id, limit=limit)),
+    )
+    return LeadFullOut(
+        lead=LeadOut.model_validate(lead),
+        messages=[MessageOut.model_validate(m) for m in messages],
+        calls=[CallOut.from_call(c) for c in calls],
+        activities=[ActivityOut.model_validate(a) for a in activities],
+    )
+
+
+@router.patch("/bulk", response_model=LeadBulkUpdateResult)
+async def bulk_update_leads(
+    body: LeadBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    if current_user.role == UserRole.MANAGER and body.manager_id and body.manager_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Managers cannot reassign leads")
+
+    repo = LeadRepository(db)
+    requested = set(body.ids)
+    before = await repo.lock_for_update(sorted(requested), current_user)
+    lead_ids = [row.id for row in before]
+    not_found = sorted(requested - set(lead_ids))
+    if not lead_ids:
+        return LeadBulkUpdateResult(updated=0, not_found=not_found)
+
+    values = {"updated_at": datetime.now(timezone.utc)}
+    if body.stage_id is not None:
+        values["stage_id"] = body.stage_id
+    if body.manager_id is not None:
+        values["manager_id"] = body.manager_id
+    await repo.bulk_update(lead_ids, **values)
+
+    activities = []
+    for row in before:
+        if body.stage_id is not None and body.stage_id != row.stage_id:
+            activities.append({
+                "lead_id": row.id,
+                "kind": ActivityKind.STAGE_CHANGE,
+                "meta": {"from": row.stage_id, "to": body.stage_id, "by": current_user.name},
+            })
+        if body.manager_id is not None and body.manager_id != row.manager_id:
+            activities.append({
+                "lead_id": row.id,
+                "kind": ActivityKind.ASSIGNMENT,
+                "meta": {"from": row.manager_id, "to": body.manager_id, "by": current_user.name},
+            })
+    await ActivityRepository(db).create_many(activities)
+
+    from app.api.v1.ws import manager as ws_manager
+    await ws_manager.broadcast_event({
+        "event": "lead:updated",
+        "data": {
+            "ids": lead_ids,
+            "action": "bulk_updated",
+            "stage_id": body.stage_id,
+            "manager_id": body.manager_id,
+        },
+    })
+
+    return LeadBulkUpdateResult(updated=len(lead_ids), not_found=not_found)
+
+
 @router.patch("/{lead_id}", response_model=LeadOut)
 async def update_lead(
     lead_id: int,
     body: LeadUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     repo = LeadRepository(db)
     lead = await repo.check_access(lead_id, current_user)
@@ -123,7 +300,7 @@ async def update_lead(
         lead.is_returning = body.is_returning
 
     lead.updated_at = datetime.now(timezone.utc)
-    lead = await repo.update(lead)
+    lead = await repo.update(lead, profile="detail")
 
     if body.stage_id is not None and body.stage_id != old_stage:
         await activity_repo.create(Activity(
@@ -152,7 +329,7 @@ async def update_lead(
 async def get_timeline(
     lead_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     lead_repo = LeadRepository(db)
     lead = await lead_repo.check_access(lead_id, current_user)
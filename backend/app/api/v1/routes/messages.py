@@ -1,37 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.deps import get_current_user
-from app.models.user import User
+from app.core.http import get_http_client
+from app.core.principal_cache import Principal
 from app.schemas.message import MessageOut, SendMessageRequest, DialogOut
 from app.repositories.lead_repo import LeadRepository
 from app.repositories.message_repo import MessageRepository
 from app.services.whatsapp_service import WhatsAppService
+from app.utils.cursor import InvalidCursorError
 
 router = APIRouter(tags=["messages"])
 
 
 @router.get("/dialogs", response_model=list[DialogOut])
 async def list_dialogs(
+    response: Response,
+    limit: int = Query(100, le=500),
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     repo = MessageRepository(db)
-    return await repo.get_dialogs(current_user)
+    try:
+        dialogs = await repo.get_dialogs(current_user, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    next_cursor = repo.next_dialog_cursor(dialogs, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return dialogs
 
 
 @router.get("/leads/{lead_id}/messages", response_model=list[MessageOut])
 async def get_messages(
     lead_id: int,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    limit: int = Query(50, ge=1, le=200),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
+    if before_id and after_id:
+        raise HTTPException(status_code=400, detail="Use either before_id or after_id")
     lead_repo = LeadRepository(db)
     lead = await lead_repo.check_access(lead_id, current_user)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found or access denied")
     repo = MessageRepository(db)
-    return await repo.get_by_lead(lead_id)
+    try:
+        return await repo.get_by_lead(lead_id, limit=limit, before_id=before_id, after_id=after_id)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/leads/{lead_id}/messages/send", response_model=MessageOut)
@@ -39,14 +60,15 @@ async def send_message(
     lead_id: int,
     body: SendMessageRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    http: httpx.AsyncClient = Depends(get_http_client),
+    current_user: Principal = Depends(get_current_user),
 ):
     lead_repo = LeadRepository(db)
     lead = await lead_repo.check_access(lead_id, current_user)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found or access denied")
 
-    wa_service = WhatsAppService(db)
+    wa_service = WhatsAppService(db, http)
 
     if body.template_name:
         message = await wa_service.send_template(lead, body.template_name, body.content)
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.deps import get_current_user, require_roles
-from app.models.user import User, UserRole
+from app.core.principal_cache import Principal
+from app.models.user import UserRole
 from app.models.pipeline import Pipeline, Stage
-from app.schemas.pipeline import PipelineOut, PipelineCreate, StageCreate, StageUpdate
+from app.schemas.pipeline import (
+    PipelineOut, PipelineCreate, StageCreate, StageUpdate, BoardOut, BoardColumnOut, BoardLeadOut,
+)
 from app.schemas.lead import StageOut
 from app.repositories.pipeline_repo import PipelineRepository, StageRepository
+from app.repositories.lead_repo import LeadRepository
+from app.utils.cursor import encode_cursor
 
 router = APIRouter(prefix="/pipelines", tags=["pipelines"])
 
@@ -14,7 +19,7 @@ router = APIRouter(prefix="/pipelines", tags=["pipelines"])
 @router.get("", response_model=list[PipelineOut])
 async def list_pipelines(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     repo = PipelineRepository(db)
     return await repo.get_all()
@@ -24,18 +29,44 @@ async def list_pipelines(
 async def create_pipeline(
     body: PipelineCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = PipelineRepository(db)
     pipeline = Pipeline(name=body.name, is_default=body.is_default)
     return await repo.create(pipeline)
 
 
+@router.get("/{pipeline_id}/board", response_model=BoardOut)
+async def get_board(
+    pipeline_id: int,
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    pipeline = await PipelineRepository(db).get_by_id(pipeline_id)
+    if not pipeline:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    stages = await StageRepository(db).get_by_pipeline(pipeline_id)
+    rows = await LeadRepository(db).get_board(pipeline_id, current_user, per_stage=limit)
+
+    columns = {stage.id: BoardColumnOut(stage=StageOut.model_validate(stage), count=0) for stage in stages}
+    for row in rows:
+        column = columns[row.stage_id]
+        column.count = row.stage_total
+        column.leads.append(BoardLeadOut.model_validate(row._mapping))
+    for column in columns.values():
+        if column.count > len(column.leads):
+            last = column.leads[-1]
+            column.next_cursor = encode_cursor(last.updated_at, last.id)
+
+    return BoardOut(pipeline_id=pipeline_id, columns=list(columns.values()))
+
+
 @router.post("/stages", response_model=StageOut, status_code=status.HTTP_201_CREATED)
 async def create_stage(
     body: StageCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = StageRepository(db)
     stage = Stage(pipeline_id=body.pipeline_id, name=body.name, position=body.position, color=body.color)
@@ -47,7 +78,7 @@ async def update_stage(
     stage_id: int,
     body: StageUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = StageRepository(db)
     stage = await repo.get_by_id(stage_id)
@@ -66,7 +97,7 @@ async def update_stage(
 async def delete_stage(
     stage_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = StageRepository(db)
     stage = await repo.get_by_id(stage_id)
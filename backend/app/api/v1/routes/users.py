@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.deps import require_roles
+from app.core.principal_cache import principal_cache
 from app.core.security import hash_password
+from app.core.principal_cache import Principal
 from app.models.user import User, UserRole
 from app.schemas.user import UserOut, UserCreate, UserUpdate
 from app.repositories.user_repo import UserRepository
@@ -13,7 +15,7 @@ router = APIRouter(prefix="/users", tags=["users"])
 @router.get("", response_model=list[UserOut])
 async def list_users(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = UserRepository(db)
     return await repo.get_all()
@@ -23,7 +25,7 @@ async def list_users(
 async def create_user(
     body: UserCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN)),
 ):
     repo = UserRepository(db)
     existing = await repo.get_by_email(body.email)
@@ -42,7 +44,7 @@ async def create_user(
 async def get_user(
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN, UserRole.HEAD)),
 ):
     repo = UserRepository(db)
     user = await repo.get_by_id(user_id)
@@ -56,7 +58,7 @@ async def update_user(
     user_id: int,
     body: UserUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN)),
 ):
     repo = UserRepository(db)
     user = await repo.get_by_id(user_id)
@@ -72,14 +74,18 @@ async def update_user(
         user.is_active = body.is_active
     if body.password is not None:
         user.password_hash = hash_password(body.password)
-    return await repo.update(user)
+    user = await repo.update(user)
+    # Commit first: a request racing an earlier invalidation would re-cache the old row
+    await db.commit()
+    await principal_cache.invalidate(user.id)
+    return user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_roles(UserRole.ADMIN)),
+    current_user: Principal = Depends(require_roles(UserRole.ADMIN)),
 ):
     repo = UserRepository(db)
     user = await repo.get_by_id(user_id)
@@ -87,3 +93,5 @@ async def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
     user.is_active = False
     await repo.update(user)
+    await db.commit()
+    await principal_cache.invalidate(user.id)
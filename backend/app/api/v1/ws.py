@@ -1,7 +1,8 @@
 import json
 import logging
 from fastapi import WebSocket, WebSocketDisconnect
-from app.models.user import User, UserRole
+from app.core.principal_cache import Principal
+from app.models.user import UserRole
 
 logger = logging.getLogger("atlas_crm.ws")
 
@@ -9,14 +10,17 @@ logger = logging.getLogger("atlas_crm.ws")
 class ConnectionManager:
     def __init__(self):
         self.active: dict[int, WebSocket] = {}
+        self.roles: dict[int, UserRole] = {}
 
-    async def connect(self, user: User, websocket: WebSocket):
+    async def connect(self, user: Principal, websocket: WebSocket):
         await websocket.accept()
         self.active[user.id] = websocket
+        self.roles[user.id] = user.role
         logger.info(f"WS connected: user {user.id} ({user.name})")
 
     def disconnect(self, user_id: int):
         self.active.pop(user_id, None)
+        self.roles.pop(user_id, None)
         logger.info(f"WS disconnected: user {user_id}")
 
     async def send_to_user(self, user_id: int, data: dict):
@@ -37,6 +41,19 @@ class ConnectionManager:
         for uid in disconnected:
             self.disconnect(uid)
 
+    async def send_to_roles(self, roles: tuple[UserRole, ...], data: dict):
+        message = json.dumps(data)
+        disconnected = []
+        for uid, ws in list(self.active.items()):
+            if self.roles.get(uid) not in roles:
+                continue
+            try:
+                await ws.send_text(message)
+            except Exception:
+                disconnected.append(uid)
+        for uid in disconnected:
+            self.disconnect(uid)
+
     async def broadcast_to_lead_owner(self, lead, data: dict):
         if lead.manager_id:
             await self.send_to_user(lead.manager_id, data)
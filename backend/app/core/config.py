@@ -28,16 +28,66 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Authenticated-principal cache: "memory" (per process) or "redis" (shared). TTL 0 disables it.
+    # "memory" only invalidates in the process that changed the user, so other API workers keep
+    # a demoted or deactivated user's old role for up to the TTL; use "redis" with several workers.
+    PRINCIPAL_CACHE_BACKEND: str = "memory"
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+
     WHATSAPP_TOKEN: str = ""
     WHATSAPP_PHONE_ID: str = ""
     WHATSAPP_VERIFY_TOKEN: str = "atlas-verify-token"
     WHATSAPP_API_URL: str = "https://graph.facebook.com/v18.0"
 
+    # Outbound pacing per phone number: "redis" shares the token bucket across processes, "memory" is per process
+    WHATSAPP_RATE_LIMIT_BACKEND: str = "redis"
+    WHATSAPP_RATE_PER_SECOND: float = 20.0
+    WHATSAPP_RATE_BURST: int = 20
+    WHATSAPP_SEND_CONCURRENCY: int = 8
+    WHATSAPP_SEND_MAX_ATTEMPTS: int = 5
+    WHATSAPP_SEND_BACKOFF_SECONDS: float = 1.0
+    WHATSAPP_SEND_BACKOFF_MAX_SECONDS: float = 30.0
+
     SIPUNI_API_KEY: str = ""
     SIPUNI_WEBHOOK_SECRET: str = ""
+    SIPUNI_API_URL: str = "https://sipuni.com/api"
 
     MOCK_INTEGRATIONS: bool = True
 
+    # Shared outbound HTTP client (WhatsApp, Sipuni)
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CLIENT_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS: float = 5.0
+
+    # Webhook ingestion: "inline" handles payloads in the request, "queue" persists
+    # them to the inbox table, acks immediately and lets the inbox worker process them.
+    WEBHOOK_INGEST_MODE: str = "inline"
+    WEBHOOK_WORKERS: int = 2
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 1.0
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+    WEBHOOK_RETENTION_HOURS: int = 24
+    WEBHOOK_DEDUP_CACHE_SIZE: int = 100_000
+
+    # Broadcast engine: sends in flight per broadcast (overridable per broadcast) and recipients per DB write
+    BROADCAST_CONCURRENCY: int = 8
+    BROADCAST_BATCH_SIZE: int = 200
+    BROADCAST_SEGMENT_CHUNK_SIZE: int = 1000
+    # Segment leads per shard task; shards run in parallel across Celery workers
+    BROADCAST_SHARD_SIZE: int = 5000
+    # A sending broadcast can only be resumed once its run has not written anything for this long
+    BROADCAST_STALE_AFTER_SECONDS: int = 300
+    # Progress events go out at most this often, or whenever another step of the total is done
+    BROADCAST_PROGRESS_INTERVAL_SECONDS: float = 2.0
+    BROADCAST_PROGRESS_PERCENT_STEP: int = 5
+
+    LEAD_IMPORT_CHUNK_SIZE: int = 1000
+    LEAD_EXPORT_BATCH_SIZE: int = 1000
+
     CORS_ORIGINS: list[str] = ["http://localhost:5173", "http://localhost:3000", "http://localhost", "*"]
 
     class Config:
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Hashable
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+from app.core.config import get_settings
+from app.core.metrics import registry
+
+settings = get_settings()
+
+PENDING_KEY = "dedup_pending"
+
+dedup_checks = registry.counter(
+    "webhook_dedup_total",
+    "Inbound webhook deliveries by dedup result: new, memory_hit or db_hit",
+)
+
+
+class RecentKeys:
+    """Bounded per-process LRU of idempotency keys already committed to the database."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._keys: OrderedDict[Hashable, None] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key not in self._keys:
+            return False
+        self._keys.move_to_end(key)
+        return True
+
+    def add(self, key: Hashable) -> None:
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+
+def _pending(db: AsyncSession) -> list:
+    return db.sync_session.info.setdefault(PENDING_KEY, [])
+
+
+def remember_on_commit(db: AsyncSession, keys: RecentKeys, key: Hashable) -> None:
+    """Add key to the LRU once db commits, so a rolled-back insert is never treated as seen."""
+    _pending(db).append((keys, key))
+
+
+def pending_marker(db: AsyncSession) -> int:
+    return len(_pending(db))
+
+
+def discard_pending(db: AsyncSession, marker: int) -> None:
+    """Drop keys staged since marker, for work undone by a savepoint rollback."""
+    del _pending(db)[marker:]
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for keys, key in session.info.pop(PENDING_KEY, []):
+        keys.add(key)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_pending(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+whatsapp_message_ids = RecentKeys(settings.WEBHOOK_DEDUP_CACHE_SIZE)
+sipuni_events = RecentKeys(settings.WEBHOOK_DEDUP_CACHE_SIZE)
@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import decode_token
+from app.core.principal_cache import Principal, principal_cache
 from app.db.session import get_db
 from app.models.user import User, UserRole
 from sqlalchemy import select
@@ -9,37 +10,51 @@ from sqlalchemy import select
 security_scheme = HTTPBearer()
 
 
+async def load_principal(db: AsyncSession, user_id: int) -> Principal | None:
+    principal = await principal_cache.get(user_id)
+    if principal:
+        return principal
+    result = await db.execute(
+        select(User.id, User.email, User.name, User.role, User.is_active, User.created_at)
+        .where(User.id == user_id, User.is_active.is_(True))
+    )
+    row = result.one_or_none()
+    if not row:
+        return None
+    principal = Principal(**row._asdict())
+    await principal_cache.set(principal)
+    return principal
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
     db: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
     payload = decode_token(credentials.credentials)
     if not payload or payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    result = await db.execute(select(User).where(User.id == int(user_id), User.is_active.is_(True)))
-    user = result.scalar_one_or_none()
+    user = await load_principal(db, int(user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found or inactive")
     return user
 
 
 def require_roles(*roles: UserRole):
-    async def checker(current_user: User = Depends(get_current_user)) -> User:
+    async def checker(current_user: Principal = Depends(get_current_user)) -> Principal:
         if current_user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
         return current_user
     return checker
 
 
-async def get_ws_user(token: str = Query(...), db: AsyncSession = Depends(get_db)) -> User:
+async def get_ws_user(token: str = Query(...), db: AsyncSession = Depends(get_db)) -> Principal | None:
     payload = decode_token(token)
     if not payload or payload.get("type") != "access":
         return None
     user_id = payload.get("sub")
     if not user_id:
         return None
-    result = await db.execute(select(User).where(User.id == int(user_id), User.is_active.is_(True)))
-    return result.scalar_one_or_none()
+    return await load_principal(db, int(user_id))
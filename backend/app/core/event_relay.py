@@ -0,0 +1,85 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable
+from app.core.config import get_settings
+from app.models.user import UserRole
+
+logger = logging.getLogger("atlas_crm.event_relay")
+settings = get_settings()
+
+CHANNEL = "atlas_crm:ws_events"
+RECONNECT_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+Deliver = Callable[[tuple[UserRole, ...], dict], Awaitable[None]]
+
+
+class EventRelay:
+    """Redis pub/sub hop for WebSocket events raised outside the API processes.
+
+    Sockets only exist in the API processes, so Celery workers publish here and
+    every API process subscribes in its lifespan and delivers to its own connections.
+    """
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis = None
+        self._task: asyncio.Task | None = None
+        self._degraded = False
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    async def publish(self, roles: tuple[UserRole, ...], data: dict) -> None:
+        message = json.dumps({"roles": [role.value for role in roles], "data": data})
+        try:
+            await self._get_redis().publish(CHANNEL, message)
+        except Exception as e:
+            if not self._degraded:
+                logger.warning(f"WS event relay unavailable, events are dropped: {e}")
+                self._degraded = True
+        else:
+            if self._degraded:
+                logger.info("WS event relay reachable again")
+                self._degraded = False
+
+    def start(self, deliver: Deliver) -> None:
+        self._task = asyncio.create_task(self._listen(deliver))
+
+    async def _listen(self, deliver: Deliver) -> None:
+        failures = 0
+        while True:
+            try:
+                async with self._get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    if failures:
+                        logger.info("WS event relay subscribed again")
+                    failures = 0
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        payload = json.loads(message["data"])
+                        await deliver(tuple(UserRole(role) for role in payload["roles"]), payload["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not failures:
+                    logger.warning(f"WS event relay subscription lost, retrying: {e}")
+                failures += 1
+                await asyncio.sleep(min(RECONNECT_MAX_SECONDS, RECONNECT_SECONDS * 2 ** (failures - 1)))
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+event_relay = EventRelay(settings.REDIS_URL)
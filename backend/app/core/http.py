@@ -0,0 +1,37 @@
+import httpx
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_client: httpx.AsyncClient | None = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.HTTP_CLIENT_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT_SECONDS, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client for outbound integration calls; also a FastAPI dependency.
+
+    The pool is bound to the event loop that first uses it, so each process
+    (API lifespan, Celery worker) must keep using a single loop.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
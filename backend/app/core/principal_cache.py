@@ -0,0 +1,127 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from app.core.config import get_settings
+from app.models.user import UserRole
+
+logger = logging.getLogger("atlas_crm.principal_cache")
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Lightweight snapshot of an authenticated user, safe to share between requests."""
+
+    id: int
+    email: str
+    name: str
+    role: UserRole
+    is_active: bool
+    created_at: datetime
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": self.id,
+            "email": self.email,
+            "name": self.name,
+            "role": self.role.value,
+            "is_active": self.is_active,
+            "created_at": self.created_at.isoformat(),
+        })
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "Principal":
+        data = json.loads(raw)
+        return cls(
+            id=data["id"],
+            email=data["email"],
+            name=data["name"],
+            role=UserRole(data["role"]),
+            is_active=data["is_active"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+        )
+
+
+class PrincipalCache:
+    """TTL-bounded principal cache keyed by user id.
+
+    Uses a bounded in-process LRU by default. With the "redis" backend the
+    entries live in Redis instead, so invalidation is seen by every API process;
+    with the in-process LRU other processes only catch up when their entry expires.
+    """
+
+    KEY_PREFIX = "principal:"
+
+    def __init__(self, ttl_seconds: float, max_size: int = 10_000, redis_url: str | None = None):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self.redis_url = redis_url
+        self._local: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._redis = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    async def get(self, user_id: int) -> Principal | None:
+        if not self.enabled:
+            return None
+        if self.redis_url:
+            try:
+                raw = await self._get_redis().get(f"{self.KEY_PREFIX}{user_id}")
+            except Exception as e:
+                logger.warning(f"Principal cache read failed: {e}")
+                return None
+            return Principal.from_json(raw) if raw else None
+
+        entry = self._local.get(user_id)
+        if not entry:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            self._local.pop(user_id, None)
+            return None
+        self._local.move_to_end(user_id)
+        return principal
+
+    async def set(self, principal: Principal) -> None:
+        if not self.enabled:
+            return
+        if self.redis_url:
+            try:
+                await self._get_redis().set(f"{self.KEY_PREFIX}{principal.id}", principal.to_json(), ex=max(1, int(self.ttl)))
+            except Exception as e:
+                logger.warning(f"Principal cache write failed: {e}")
+            return
+
+        self._local[principal.id] = (time.monotonic() + self.ttl, principal)
+        self._local.move_to_end(principal.id)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def invalidate(self, user_id: int) -> None:
+        self._local.pop(user_id, None)
+        if self.redis_url:
+            try:
+                await self._get_redis().delete(f"{self.KEY_PREFIX}{user_id}")
+            except Exception as e:
+                logger.warning(f"Principal cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        self._local.clear()
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    redis_url=settings.REDIS_URL if settings.PRINCIPAL_CACHE_BACKEND == "redis" else None,
+)
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("atlas_crm.rate_limit")
+
+# Refill and take in one step on Redis' clock, so every process sees the same bucket.
+# Returns the seconds to wait before a token is available ("0" when one was taken).
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'paused_until')
+local paused_until = tonumber(state[3]) or 0
+if paused_until > now then
+    return tostring(paused_until - now)
+end
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+PAUSE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local paused_until = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('HGET', KEYS[1], 'paused_until')) or 0
+if paused_until > current then
+    redis.call('HSET', KEYS[1], 'paused_until', paused_until)
+    redis.call('EXPIRE', KEYS[1], 3600)
+end
+return 1
+"""
+
+
+class TokenBucket:
+    """Token bucket of `rate` tokens per second holding at most `burst`.
+
+    With a redis_url the bucket state lives in Redis and is shared by every API
+    process and Celery worker; if Redis is unreachable it degrades to a local bucket.
+    """
+
+    def __init__(self, key: str, rate: float, burst: int, redis_url: str | None = None):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self.redis_url = redis_url
+        self._redis = None
+        self._scripts = None
+        self._tokens = float(burst)
+        self._ts = time.monotonic()
+        self._paused_until = 0.0
+        self._degraded = False
+
+    def _get_scripts(self):
+        if self._scripts is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+            self._scripts = (
+                self._redis.register_script(ACQUIRE_SCRIPT),
+                self._redis.register_script(PAUSE_SCRIPT),
+            )
+        return self._scripts
+
+    async def try_acquire(self) -> float:
+        """Take a token if one is available; otherwise return how long to wait before retrying."""
+        if self.redis_url:
+            try:
+                acquire, _ = self._get_scripts()
+                wait = float(await acquire(keys=[self.key], args=[self.rate, self.burst]))
+            except Exception as e:
+                if not self._degraded:
+                    logger.warning(f"Shared rate limiter unavailable, using local bucket: {e}")
+                    self._degraded = True
+            else:
+                if self._degraded:
+                    logger.info("Shared rate limiter reachable again")
+                    self._degraded = False
+                return wait
+        return self._try_acquire_local()
+
+    def _try_acquire_local(self) -> float:
+        now = time.monotonic()
+        if self._paused_until > now:
+            return self._paused_until - now
+        self._tokens = min(self.burst, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while (wait := await self.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+    async def pause(self, seconds: float) -> None:
+        """Hold every consumer of the bucket back, e.g. after the API answered with Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        if self.redis_url:
+            try:
+                _, pause = self._get_scripts()
+                await pause(keys=[self.key], args=[seconds])
+            except Exception as e:
+                logger.warning(f"Shared rate limiter pause failed: {e}")
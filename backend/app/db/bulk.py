@@ -0,0 +1,11 @@
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Keeps a statement far below the 32767 bind parameters Postgres accepts
+MAX_ROWS_PER_INSERT = 1000
+
+
+async def insert_rows(db: AsyncSession, model, rows: list[dict]) -> None:
+    """Insert rows with multi-row INSERT ... VALUES statements instead of one statement per row."""
+    for start in range(0, len(rows), MAX_ROWS_PER_INSERT):
+        await db.execute(insert(model).values(rows[start:start + MAX_ROWS_PER_INSERT]))
@@ -0,0 +1,94 @@
+from sqlalchemy import Connection, text
+from app.db.base import Base
+
+POSTGRES_EXTENSIONS = ("pg_trgm",)
+
+# In-place upgrades for databases created before a model changed; each must be idempotent.
+POSTGRES_UPGRADES = (
+    # leads.tags: json -> jsonb, for the GIN tag index
+    """
+    DO $$
+    BEGIN
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'leads' AND column_name = 'tags') = 'json' THEN
+            ALTER TABLE leads ALTER COLUMN tags TYPE jsonb USING tags::jsonb;
+        END IF;
+    END $$
+    """,
+    # messages.wa_message_id becomes unique: keep the first copy of any duplicated delivery
+    # as the keyed row, and drop the old non-unique index the unique one replaces
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_indexes
+            WHERE schemaname = current_schema() AND indexname = 'uq_messages_wa_message_id') THEN
+            UPDATE messages m SET wa_message_id = NULL
+            FROM messages d
+            WHERE m.wa_message_id = d.wa_message_id AND m.id > d.id;
+        END IF;
+    END $$
+    """,
+    "DROP INDEX IF EXISTS ix_messages_wa_message_id",
+    "ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS concurrency INTEGER",
+    # Resumable, sharded broadcasts: new statuses, progress counters, and one log per (broadcast, lead)
+    # before the unique index over them is created
+    "ALTER TYPE broadcaststatus ADD VALUE IF NOT EXISTS 'PAUSED'",
+    "ALTER TYPE broadcaststatus ADD VALUE IF NOT EXISTS 'CANCELLED'",
+    "ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS total_count INTEGER",
+    "ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS sent_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS failed_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ",
+    "ALTER TABLE broadcast_shards ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_indexes
+            WHERE schemaname = current_schema() AND indexname = 'uq_broadcast_logs_broadcast_lead') THEN
+            DELETE FROM broadcast_logs l
+            USING broadcast_logs d
+            WHERE l.broadcast_id = d.broadcast_id AND l.lead_id = d.lead_id AND l.id > d.id;
+        END IF;
+    END $$
+    """,
+    "DROP INDEX IF EXISTS ix_broadcast_logs_broadcast_id",
+    # lead_dialog_state: one-off backfill from existing messages; unread counts client messages
+    # since the manager's last direct reply, as MessageRepository.touch_dialog keeps it
+    """
+    INSERT INTO lead_dialog_state (lead_id, last_message_id, last_message_preview, last_message_at, unread_count)
+    SELECT DISTINCT ON (m.lead_id)
+        m.lead_id, m.id, left(m.content, 255), m.created_at,
+        count(*) FILTER (
+            WHERE m.sender_type = 'CLIENT' AND (r.replied_at IS NULL OR m.created_at > r.replied_at)
+        ) OVER (PARTITION BY m.lead_id)
+    FROM messages m
+    LEFT JOIN (
+        SELECT lead_id, max(created_at) AS replied_at FROM messages
+        WHERE sender_type = 'MANAGER' AND type = 'TEXT'
+        GROUP BY lead_id
+    ) r ON r.lead_id = m.lead_id
+    WHERE NOT EXISTS (SELECT 1 FROM lead_dialog_state)
+    ORDER BY m.lead_id, m.created_at DESC, m.id DESC
+    """,
+)
+
+
+def create_extensions(conn: Connection) -> None:
+    if conn.dialect.name != "postgresql":
+        return
+    for name in POSTGRES_EXTENSIONS:
+        conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {name}"))
+
+
+def run_upgrades(conn: Connection) -> None:
+    if conn.dialect.name != "postgresql":
+        return
+    for statement in POSTGRES_UPGRADES:
+        conn.execute(text(statement))
+
+
+def create_missing_indexes(conn: Connection) -> None:
+    # create_all skips tables that already exist, so indexes added to a model
+    # later would never reach an existing database without this.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
@@ -15,3 +15,9 @@ async def get_db():
         except Exception:
             await session.rollback()
             raise
+
+
+async def run_in_session(fn):
+    """Run fn(session) on its own pooled session, so independent reads can be gathered concurrently."""
+    async with async_session() as session:
+        return await fn(session)
@@ -0,0 +1,328 @@
+"""Local stand-in for the WhatsApp Cloud API and Sipuni, for load tests and retry drills.
+
+Run it next to the CRM and point the integrations at it:
+
+    uvicorn app.devtools.fake_integrations:app --port 9000
+    WHATSAPP_API_URL=http://localhost:9000/v18.0 SIPUNI_API_URL=http://localhost:9000/sipuni MOCK_INTEGRATIONS=false
+
+Accepted sends come back as status webhooks (sent, delivered, read or failed) posted to
+FAKE_APP_URL, click-to-call produces Sipuni call webhooks, and latency, 5xx, random 429s and
+a per-number throughput cap are all configurable through FAKE_* environment variables.
+"""
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from pydantic_settings import BaseSettings
+import httpx
+from app.core.metrics import Registry
+from app.core.rate_limit import TokenBucket
+
+logger = logging.getLogger("atlas_crm.fake_integrations")
+
+WHATSAPP_WEBHOOK_PATH = "/api/v1/integrations/whatsapp/webhook"
+SIPUNI_WEBHOOK_PATH = "/api/v1/integrations/sipuni/webhook"
+
+
+class FakeIntegrationSettings(BaseSettings):
+    # Where the CRM is listening for webhooks
+    APP_URL: str = "http://localhost:8000"
+
+    # Response latency: log-normal with this median and p99 (equal values give a fixed delay)
+    LATENCY_MEDIAN_MS: float = 80.0
+    LATENCY_P99_MS: float = 400.0
+
+    # Fault injection, as probabilities per request
+    ERROR_RATE: float = 0.0
+    THROTTLE_RATE: float = 0.0
+    RETRY_AFTER_SECONDS: float = 1.0
+    # Graph API throughput cap per phone number; 0 turns it off
+    RATE_LIMIT_PER_SECOND: float = 80.0
+
+    # Status webhooks for accepted sends
+    STATUS_DELAY_MS: float = 200.0
+    READ_RATE: float = 0.5
+    FAIL_RATE: float = 0.0
+    STATUS_BATCH_SIZE: int = 50
+    STATUS_FLUSH_MS: float = 100.0
+    WEBHOOK_CONCURRENCY: int = 16
+
+    # Sipuni click-to-call
+    CALL_DURATION_SECONDS: float = 2.0
+    CALL_ANSWER_RATE: float = 0.8
+
+    SEED: int | None = None
+
+    class Config:
+        env_prefix = "FAKE_"
+        env_file = ".env"
+        extra = "ignore"
+
+
+class InboundBurst(BaseModel):
+    phones: list[str] = Field(min_length=1)
+    count: int = 1
+    text: str = "Load test message"
+
+
+class LatencyModel:
+    def __init__(self, median_ms: float, p99_ms: float, rng: random.Random):
+        self.mu = math.log(max(median_ms, 0.001) / 1000)
+        # z(0.99) = 2.326: p99 = median * exp(2.326 * sigma)
+        self.sigma = math.log(p99_ms / median_ms) / 2.326 if median_ms > 0 and p99_ms > median_ms else 0.0
+        self.fixed = median_ms <= 0
+        self.rng = rng
+
+    def sample(self) -> float:
+        if self.fixed:
+            return 0.0
+        return self.rng.lognormvariate(self.mu, self.sigma)
+
+
+def graph_error(status_code: int, code: int, message: str, retry_after: float | None = None) -> JSONResponse:
+    headers = {"Retry-After": f"{retry_after:g}"} if retry_after is not None else None
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": "OAuthException", "code": code, "fbtrace_id": uuid.uuid4().hex[:11]}},
+        headers=headers,
+    )
+
+
+def status_entry(phone_id: str, statuses: list[dict]) -> dict:
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "fake-waba",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": phone_id, "phone_number_id": phone_id},
+                    "statuses": statuses,
+                },
+            }],
+        }],
+    }
+
+
+def inbound_entry(phone_id: str, phone: str, text: str) -> dict:
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "fake-waba",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": phone_id, "phone_number_id": phone_id},
+                    "contacts": [{"profile": {"name": phone}, "wa_id": phone}],
+                    "messages": [{
+                        "from": phone,
+                        "id": f"wamid.fake{uuid.uuid4().hex}",
+                        "timestamp": str(int(time.time())),
+                        "type": "text",
+                        "text": {"body": text},
+                    }],
+                },
+            }],
+        }],
+    }
+
+
+class FakeIntegrations:
+    """State behind the fake app: fault injection, throughput caps and the webhook emitter."""
+
+    def __init__(self, config: FakeIntegrationSettings, transport: httpx.AsyncBaseTransport | None = None):
+        self.config = config
+        self.rng = random.Random(config.SEED)
+        self.latency = LatencyModel(config.LATENCY_MEDIAN_MS, config.LATENCY_P99_MS, self.rng)
+        self.transport = transport
+        self.buckets: dict[str, TokenBucket] = {}
+        self.metrics = Registry()
+        self.requests = self.metrics.counter("fake_requests_total", "Fake API calls, by api and outcome")
+        self.webhooks = self.metrics.counter("fake_webhooks_total", "Webhooks posted back to the app, by kind and outcome")
+        self.http: httpx.AsyncClient | None = None
+        self._statuses: asyncio.Queue | None = None
+        self._webhook_slots: asyncio.Semaphore | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._flusher: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self.http = httpx.AsyncClient(base_url=self.config.APP_URL, transport=self.transport, timeout=30.0)
+        self._statuses = asyncio.Queue()
+        self._webhook_slots = asyncio.Semaphore(self.config.WEBHOOK_CONCURRENCY)
+        self._flusher = asyncio.create_task(self._flush_statuses())
+
+    async def stop(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *([self._flusher] if self._flusher else []), return_exceptions=True)
+        if self.http:
+            await self.http.aclose()
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def respond_delay(self) -> None:
+        delay = self.latency.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def injected_fault(self, api: str, phone_id: str) -> JSONResponse | None:
+        """Pick the error this call should fail with, if any: cap first, then random 429s and 5xx."""
+        if self.config.RATE_LIMIT_PER_SECOND > 0:
+            bucket = self.buckets.get(phone_id)
+            if bucket is None:
+                rate = self.config.RATE_LIMIT_PER_SECOND
+                bucket = self.buckets[phone_id] = TokenBucket(f"fake:{phone_id}", rate=rate, burst=max(1, int(rate)))
+            if await bucket.try_acquire() > 0:
+                self.requests.inc(api=api, outcome="capped")
+                return graph_error(429, 130429, "Rate limit hit", self.config.RETRY_AFTER_SECONDS)
+        if self.rng.random() < self.config.THROTTLE_RATE:
+            self.requests.inc(api=api, outcome="throttled")
+            return graph_error(429, 80007, "Rate limit issues", self.config.RETRY_AFTER_SECONDS)
+        if self.rng.random() < self.config.ERROR_RATE:
+            self.requests.inc(api=api, outcome="error")
+            return graph_error(self.rng.choice((500, 503)), 1, "An unknown error occurred")
+        return None
+
+    def schedule_statuses(self, phone_id: str, wa_id: str, recipient: str) -> None:
+        step = self.config.STATUS_DELAY_MS / 1000
+        if self.rng.random() < self.config.FAIL_RATE:
+            steps = ["failed"]
+        else:
+            steps = ["sent", "delivered"] + (["read"] if self.rng.random() < self.config.READ_RATE else [])
+        loop = asyncio.get_running_loop()
+        for i, status in enumerate(steps, start=1):
+            entry = {
+                "id": wa_id,
+                "status": status,
+                "timestamp": str(int(time.time() + i * step)),
+                "recipient_id": recipient,
+            }
+            if status == "failed":
+                entry["errors"] = [{"code": 131026, "title": "Message undeliverable"}]
+            loop.call_later(i * step, self._statuses.put_nowait, (phone_id, entry))
+
+    async def _flush_statuses(self) -> None:
+        # Meta batches status callbacks; several statuses per webhook exercise the set-based apply
+        flush_after = self.config.STATUS_FLUSH_MS / 1000
+        while True:
+            batches: dict[str, list[dict]] = {}
+            phone_id, entry = await self._statuses.get()
+            batches.setdefault(phone_id, []).append(entry)
+            deadline = time.monotonic() + flush_after
+            queued = 1
+            while queued < self.config.STATUS_BATCH_SIZE:
+                try:
+                    phone_id, entry = await asyncio.wait_for(self._statuses.get(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                batches.setdefault(phone_id, []).append(entry)
+                queued += 1
+            for phone_id, statuses in batches.items():
+                self._spawn(self.post_webhook("whatsapp_status", WHATSAPP_WEBHOOK_PATH, status_entry(phone_id, statuses)))
+
+    async def post_webhook(self, kind: str, path: str, payload: dict) -> None:
+        async with self._webhook_slots:
+            try:
+                resp = await self.http.post(path, json=payload)
+            except httpx.HTTPError as e:
+                self.webhooks.inc(kind=kind, outcome="error")
+                logger.warning(f"Webhook {kind} to {path} failed: {e}")
+                return
+        self.webhooks.inc(kind=kind, outcome="ok" if resp.status_code < 400 else str(resp.status_code))
+
+    async def run_call(self, call_id: str, phone: str) -> None:
+        answered = self.rng.random() < self.config.CALL_ANSWER_RATE
+        base = {"call_id": call_id, "dst_number": phone, "direction": "out", "ext": "100"}
+        await self.post_webhook("sipuni", SIPUNI_WEBHOOK_PATH, {**base, "event": "call_start", "status": "ringing"})
+        duration = self.config.CALL_DURATION_SECONDS if answered else 0
+        await asyncio.sleep(duration)
+        await self.post_webhook("sipuni", SIPUNI_WEBHOOK_PATH, {
+            **base,
+            "event": "call_end",
+            "status": "answered" if answered else "noanswer",
+            "duration": int(duration),
+            "recording_url": f"https://records.fake/{call_id}.mp3" if answered else None,
+        })
+
+
+def create_app(config: FakeIntegrationSettings | None = None, transport: httpx.AsyncBaseTransport | None = None) -> FastAPI:
+    fake = FakeIntegrations(config or FakeIntegrationSettings(), transport)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await fake.start()
+        yield
+        await fake.stop()
+
+    app = FastAPI(title="Fake WhatsApp Cloud API and Sipuni", lifespan=lifespan)
+    app.state.fake = fake
+
+    @app.post("/{version}/{phone_id}/messages")
+    async def send_message(phone_id: str, request: Request):
+        await fake.respond_delay()
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            fake.requests.inc(api="whatsapp", outcome="unauthorized")
+            return graph_error(401, 190, "Invalid OAuth access token")
+        payload = await request.json()
+        recipient = payload.get("to")
+        if payload.get("messaging_product") != "whatsapp" or not recipient:
+            fake.requests.inc(api="whatsapp", outcome="invalid")
+            return graph_error(400, 100, "Invalid parameter")
+        fault = await fake.injected_fault("whatsapp", phone_id)
+        if fault:
+            return fault
+        wa_id = f"wamid.fake{uuid.uuid4().hex}"
+        fake.requests.inc(api="whatsapp", outcome="ok")
+        fake.schedule_statuses(phone_id, wa_id, recipient)
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": recipient, "wa_id": recipient}],
+            "messages": [{"id": wa_id}],
+        }
+
+    @app.post("/sipuni/callback/call")
+    async def click_to_call(phone: str = "", sipuni_api_key: str = ""):
+        await fake.respond_delay()
+        fault = await fake.injected_fault("sipuni", "sipuni")
+        if fault:
+            return fault
+        if not phone:
+            fake.requests.inc(api="sipuni", outcome="invalid")
+            return JSONResponse(status_code=400, content={"success": False, "message": "phone is required"})
+        call_id = f"fake-{uuid.uuid4().hex[:16]}"
+        fake.requests.inc(api="sipuni", outcome="ok")
+        fake._spawn(fake.run_call(call_id, phone))
+        return {"success": True, "call_id": call_id}
+
+    @app.post("/_fake/whatsapp/inbound")
+    async def inbound_burst(burst: InboundBurst, phone_id: str = "fake-phone"):
+        for i in range(burst.count):
+            phone = burst.phones[i % len(burst.phones)]
+            fake._spawn(fake.post_webhook("whatsapp_inbound", WHATSAPP_WEBHOOK_PATH, inbound_entry(phone_id, phone, burst.text)))
+        return {"queued": burst.count}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(await fake.metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/healthz")
+    async def health():
+        return Response(status_code=204)
+
+    return app
+
+
+app = create_app()
@@ -1,28 +1,52 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import get_settings
 from app.core.logging import setup_logging
 from app.core.deps import get_ws_user
+from app.core.metrics import registry as metrics_registry
+from app.core.http import get_http_client, close_http_client
+from app.core.event_relay import event_relay
 from app.db.session import engine, get_db
 from app.db.base import Base
+from app.db.schema import create_extensions, run_upgrades, create_missing_indexes
 from app.api.v1.ws import manager as ws_manager
+from app.services.webhook_inbox_service import webhook_worker
+from app.services.whatsapp_sender import whatsapp_sender
+from app.services.broadcast_service import progress_coalescer
 
 settings = get_settings()
 
 
+async def deliver_relayed_event(roles, event: dict):
+    if progress_coalescer.admit(event):
+        await ws_manager.send_to_roles(roles, event)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging(settings.DEBUG)
     async with engine.begin() as conn:
+        await conn.run_sync(create_extensions)
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_upgrades)
+        await conn.run_sync(create_missing_indexes)
     from app.utils.seed import seed
     try:
         await seed()
     except Exception as e:
         import logging
         logging.getLogger("atlas_crm").warning(f"Seed skipped: {e}")
+    get_http_client()
+    if settings.WEBHOOK_INGEST_MODE == "queue":
+        webhook_worker.start()
+    event_relay.start(deliver_relayed_event)
     yield
+    await event_relay.close()
+    await webhook_worker.stop()
+    await whatsapp_sender.close()
+    await close_http_client()
     await engine.dispose()
 
 
@@ -38,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 from app.api.v1.routes import auth, users, leads, pipelines, messages, calls, broadcasts, distribution, analytics, integrations_whatsapp, integrations_sipuni
@@ -60,6 +85,11 @@ async def health():
     return {"status": "ok", "service": settings.APP_NAME}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(await metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/v1/me")
 async def me_alias():
     from app.api.v1.routes.auth import me
@@ -70,8 +100,7 @@ async def me_alias():
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
     from app.core.security import decode_token
-    from sqlalchemy import select
-    from app.models.user import User
+    from app.core.deps import load_principal
     from app.db.session import async_session
 
     payload = decode_token(token)
@@ -81,8 +110,7 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
 
     user_id = payload.get("sub")
     async with async_session() as db:
-        result = await db.execute(select(User).where(User.id == int(user_id)))
-        user = result.scalar_one_or_none()
+        user = await load_principal(db, int(user_id))
 
     if not user:
         await websocket.close(code=4001)
@@ -1,19 +1,21 @@
 from app.models.user import User, UserRole
 from app.models.lead import Lead
 from app.models.pipeline import Pipeline, Stage
-from app.models.message import Message, SenderType, MessageType, MessageStatus
+from app.models.message import Message, LeadDialogState, SenderType, MessageType, MessageStatus
 from app.models.call import Call, CallDirection
 from app.models.activity import Activity, ActivityKind
-from app.models.broadcast import Broadcast, BroadcastLog, BroadcastStatus
+from app.models.broadcast import Broadcast, BroadcastShard, BroadcastLog, BroadcastStatus
 from app.models.distribution import DistributionRule, DistributionAlgorithm
+from app.models.webhook import WebhookInbox, WebhookSource
 
 __all__ = [
     "User", "UserRole",
     "Lead",
     "Pipeline", "Stage",
-    "Message", "SenderType", "MessageType", "MessageStatus",
+    "Message", "LeadDialogState", "SenderType", "MessageType", "MessageStatus",
     "Call", "CallDirection",
     "Activity", "ActivityKind",
-    "Broadcast", "BroadcastLog", "BroadcastStatus",
+    "Broadcast", "BroadcastShard", "BroadcastLog", "BroadcastStatus",
     "DistributionRule", "DistributionAlgorithm",
+    "WebhookInbox", "WebhookSource",
 ]
@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime, timezone
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Enum, JSON, Text
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Enum, JSON, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
@@ -10,6 +10,8 @@ class BroadcastStatus(str, enum.Enum):
     SCHEDULED = "scheduled"
     SENDING = "sending"
     DONE = "done"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
 
 
 class Broadcast(Base):
@@ -20,7 +22,15 @@ class Broadcast(Base):
     segment: Mapped[dict | None] = mapped_column(JSON, default=dict)
     template_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     body: Mapped[str] = mapped_column(Text, default="")
+    # Sends in flight at once for this broadcast; None uses BROADCAST_CONCURRENCY
+    concurrency: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Segment size when the broadcast was planned, and outcomes so far across all shards
+    total_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sent_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    failed_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     status: Mapped[BroadcastStatus] = mapped_column(Enum(BroadcastStatus), default=BroadcastStatus.DRAFT)
+    # Bumped by a live run on every write window; a sending broadcast without a recent one lost its worker
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     scheduled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_by: Mapped[int] = mapped_column(ForeignKey("users.id"))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -29,11 +39,28 @@ class Broadcast(Base):
     creator = relationship("User")
 
 
+class BroadcastShard(Base):
+    """An id range of a broadcast's segment, sent by its own task."""
+
+    __tablename__ = "broadcast_shards"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    broadcast_id: Mapped[int] = mapped_column(ForeignKey("broadcasts.id", ondelete="CASCADE"), index=True)
+    # Segment leads with lower_id < id <= upper_id; the last shard is open-ended (upper_id NULL)
+    lower_id: Mapped[int] = mapped_column(Integer, default=0)
+    upper_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Checkpoint: every shard lead up to this id has been claimed by a run
+    last_lead_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Lease of the run sending the shard, renewed every write window and cleared when it stops
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
 class BroadcastLog(Base):
     __tablename__ = "broadcast_logs"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    broadcast_id: Mapped[int] = mapped_column(ForeignKey("broadcasts.id", ondelete="CASCADE"), index=True)
+    broadcast_id: Mapped[int] = mapped_column(ForeignKey("broadcasts.id", ondelete="CASCADE"))
     lead_id: Mapped[int] = mapped_column(ForeignKey("leads.id", ondelete="CASCADE"))
     status: Mapped[str] = mapped_column(String(50), default="pending")
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -41,3 +68,8 @@ class BroadcastLog(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     broadcast = relationship("Broadcast", back_populates="logs")
+
+    __table_args__ = (
+        # One log per lead per broadcast: claiming a lead is what makes a send exactly-once
+        Index("uq_broadcast_logs_broadcast_lead", "broadcast_id", "lead_id", unique=True),
+    )
@@ -1,11 +1,29 @@
 from datetime import datetime, timezone
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, JSON
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, JSON, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
+# Digits-only phone number. Search queries must use this exact expression so
+# PostgreSQL matches them against ix_leads_phone_digits.
+PHONE_DIGITS_SQL = r"regexp_replace(phone, '\D', '', 'g')"
+
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        # Keyset pagination on GET /leads: (updated_at, id) under the role and stage filters
+        Index("ix_leads_updated_at_id", "updated_at", "id"),
+        Index("ix_leads_manager_updated_at_id", "manager_id", "updated_at", "id"),
+        Index("ix_leads_stage_updated_at_id", "stage_id", "updated_at", "id"),
+        # Lead search: trigram name matching and phone prefix lookups (pg_trgm)
+        Index(
+            "ix_leads_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_leads_phone_digits", text(f"{PHONE_DIGITS_SQL} text_pattern_ops")).ddl_if(dialect="postgresql"),
+        # Tag segmentation: ?| / ?& containment on the jsonb tags array
+        Index("ix_leads_tags", "tags", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255))
@@ -14,14 +32,14 @@ class Lead(Base):
     language: Mapped[str] = mapped_column(String(10), default="ru")
     stage_id: Mapped[int | None] = mapped_column(ForeignKey("stages.id", ondelete="SET NULL"), nullable=True)
     manager_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    tags: Mapped[dict | None] = mapped_column(JSON, default=list)
+    tags: Mapped[list | None] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), default=list)
     is_returning: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     last_activity_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
-    stage = relationship("Stage", back_populates="leads", lazy="selectin")
-    manager = relationship("User", back_populates="leads", lazy="selectin")
+    stage = relationship("Stage", back_populates="leads", lazy="noload")
+    manager = relationship("User", back_populates="leads", lazy="noload")
     messages = relationship("Message", back_populates="lead", lazy="noload")
     calls = relationship("Call", back_populates="lead", lazy="noload")
     activities = relationship("Activity", back_populates="lead", lazy="noload")
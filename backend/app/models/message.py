@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime, timezone
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Enum, Text
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Enum, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
@@ -26,6 +26,12 @@ class MessageStatus(str, enum.Enum):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Newest-first history pages per lead, keyset on (created_at, id)
+        Index("ix_messages_lead_created_at_id", "lead_id", "created_at", "id"),
+        # Idempotency key for inbound WhatsApp deliveries
+        Index("uq_messages_wa_message_id", "wa_message_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     lead_id: Mapped[int] = mapped_column(ForeignKey("leads.id", ondelete="CASCADE"), index=True)
@@ -34,7 +40,22 @@ class Message(Base):
     content: Mapped[str] = mapped_column(Text, default="")
     media_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
     status: Mapped[MessageStatus] = mapped_column(Enum(MessageStatus), default=MessageStatus.SENT)
-    wa_message_id: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
+    wa_message_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     lead = relationship("Lead", back_populates="messages")
+
+
+class LeadDialogState(Base):
+    """Per-lead inbox row, upserted alongside every message insert so the inbox never aggregates messages."""
+
+    __tablename__ = "lead_dialog_state"
+    __table_args__ = (
+        Index("ix_lead_dialog_state_last_message_at", "last_message_at", "lead_id"),
+    )
+
+    lead_id: Mapped[int] = mapped_column(ForeignKey("leads.id", ondelete="CASCADE"), primary_key=True)
+    last_message_id: Mapped[int | None] = mapped_column(ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)
+    last_message_preview: Mapped[str] = mapped_column(String(255), default="")
+    last_message_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    unread_count: Mapped[int] = mapped_column(Integer, default=0)
@@ -12,7 +12,7 @@ class Pipeline(Base):
     is_default: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
-    stages = relationship("Stage", back_populates="pipeline", order_by="Stage.position", lazy="selectin")
+    stages = relationship("Stage", back_populates="pipeline", order_by="Stage.position", lazy="noload")
 
 
 class Stage(Base):
@@ -26,4 +26,4 @@ class Stage(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     pipeline = relationship("Pipeline", back_populates="stages")
-    leads = relationship("Lead", back_populates="stage", lazy="selectin")
+    leads = relationship("Lead", back_populates="stage", lazy="noload")
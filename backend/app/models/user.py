@@ -22,4 +22,4 @@ class User(Base):
     password_hash: Mapped[str] = mapped_column(String(255))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
-    leads = relationship("Lead", back_populates="manager", lazy="selectin")
+    leads = relationship("Lead", back_populates="manager", lazy="noload")
@@ -0,0 +1,27 @@
+import enum
+from datetime import datetime, timezone
+from sqlalchemy import Integer, DateTime, Enum, JSON, Text, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class WebhookSource(str, enum.Enum):
+    WHATSAPP = "whatsapp"
+    SIPUNI = "sipuni"
+
+
+class WebhookInbox(Base):
+    """Raw inbound webhook payload, acknowledged on receipt and processed later by the inbox worker."""
+
+    __tablename__ = "webhook_inbox"
+    __table_args__ = (
+        Index("ix_webhook_inbox_pending", "id", postgresql_where=text("processed_at IS NULL")),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    source: Mapped[WebhookSource] = mapped_column(Enum(WebhookSource))
+    payload: Mapped[dict] = mapped_column(JSON)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
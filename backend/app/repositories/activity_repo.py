@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.db.bulk import insert_rows
 from app.models.activity import Activity
 
 
@@ -22,3 +23,6 @@ class ActivityRepository:
         await self.db.flush()
         await self.db.refresh(activity)
         return activity
+
+    async def create_many(self, activities: list[dict]) -> None:
+        await insert_rows(self.db, Activity, activities)
@@ -1,6 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.broadcast import Broadcast, BroadcastLog
+from datetime import datetime
+from sqlalchemy import select, update, delete, exists, func, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.broadcast import Broadcast, BroadcastShard, BroadcastLog, BroadcastStatus
+
+LOG_PENDING = "pending"
+LOG_SENT = "sent"
+LOG_FAILED = "failed"
+
+
+def _live_shards(broadcast_id: int, stale_before: datetime):
+    return exists().where(BroadcastShard.broadcast_id == broadcast_id, BroadcastShard.heartbeat_at >= stale_before)
 
 
 class BroadcastRepository:
@@ -33,6 +43,162 @@ class BroadcastRepository:
         await self.db.flush()
         return log
 
+    async def get_status(self, broadcast_id: int) -> BroadcastStatus | None:
+        return await self.db.scalar(select(Broadcast.status).where(Broadcast.id == broadcast_id))
+
+    async def transition(
+        self, broadcast_id: int, from_statuses: tuple[BroadcastStatus, ...], to: BroadcastStatus, **values,
+    ) -> bool:
+        """Move the broadcast to `to` (setting any extra column values) only if it is currently in one of from_statuses."""
+        result = await self.db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.status.in_(from_statuses))
+            .values(status=to, **values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    async def has_live_shards(self, broadcast_id: int, stale_before: datetime) -> bool:
+        return await self.db.scalar(select(_live_shards(broadcast_id, stale_before)))
+
+    async def resume(self, broadcast_id: int, stale_before: datetime) -> bool:
+        """Move a paused broadcast, or a sending one whose run stopped heartbeating, back to sending.
+
+        Either way no shard may still be held by a live run, e.g. one finishing its last window after a pause.
+        """
+        stale = and_(
+            Broadcast.status == BroadcastStatus.SENDING,
+            or_(Broadcast.heartbeat_at.is_(None), Broadcast.heartbeat_at < stale_before),
+        )
+        result = await self.db.execute(
+            update(Broadcast)
+            .where(
+                Broadcast.id == broadcast_id,
+                or_(Broadcast.status == BroadcastStatus.PAUSED, stale),
+                ~_live_shards(broadcast_id, stale_before),
+            )
+            .values(status=BroadcastStatus.SENDING, heartbeat_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    async def add_counts(self, broadcast_id: int, sent: int, failed: int) -> tuple[int, int]:
+        """Atomically bump the progress counters (shards write concurrently) and the heartbeat; returns the new totals."""
+        result = await self.db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id)
+            .values(
+                sent_count=Broadcast.sent_count + sent,
+                failed_count=Broadcast.failed_count + failed,
+                heartbeat_at=func.now(),
+            )
+            .returning(Broadcast.sent_count, Broadcast.failed_count)
+        )
+        return tuple(result.one())
+
+    async def get_shards(self, broadcast_id: int) -> list[BroadcastShard]:
+        result = await self.db.execute(
+            select(BroadcastShard).where(BroadcastShard.broadcast_id == broadcast_id).order_by(BroadcastShard.lower_id)
+        )
+        return list(result.scalars().all())
+
+    async def get_shard(self, shard_id: int) -> BroadcastShard | None:
+        return await self.db.get(BroadcastShard, shard_id)
+
+    async def lease_shard(self, shard_id: int, stale_before: datetime) -> bool:
+        """Take the shard for this run unless another run renewed its lease since stale_before."""
+        result = await self.db.execute(
+            update(BroadcastShard)
+            .where(
+                BroadcastShard.id == shard_id,
+                or_(BroadcastShard.heartbeat_at.is_(None), BroadcastShard.heartbeat_at < stale_before),
+            )
+            .values(heartbeat_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    async def release_shard(self, shard_id: int) -> None:
+        await self.db.execute(
+            update(BroadcastShard)
+            .where(BroadcastShard.id == shard_id)
+            .values(heartbeat_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def create_shards(self, broadcast_id: int, boundaries: list[int]) -> list[BroadcastShard]:
+        """One shard per id range between consecutive boundaries, plus an open-ended last one."""
+        lowers = [0, *boundaries]
+        uppers = [*boundaries, None]
+        shards = [
+            BroadcastShard(broadcast_id=broadcast_id, lower_id=lower, upper_id=upper)
+            for lower, upper in zip(lowers, uppers)
+        ]
+        self.db.add_all(shards)
+        await self.db.flush()
+        return shards
+
+    async def claim_leads(self, broadcast_id: int, lead_ids: list[int]) -> set[int]:
+        """Insert pending logs for the leads; returns those this run now owns.
+
+        The unique (broadcast_id, lead_id) index makes a lead claimable once per
+        broadcast, however many times the broadcast is resumed or re-run.
+        """
+        if not lead_ids:
+            return set()
+        result = await self.db.execute(
+            pg_insert(BroadcastLog)
+            .values([{"broadcast_id": broadcast_id, "lead_id": lead_id, "status": LOG_PENDING} for lead_id in lead_ids])
+            .on_conflict_do_nothing(index_elements=[BroadcastLog.broadcast_id, BroadcastLog.lead_id])
+            .returning(BroadcastLog.lead_id)
+        )
+        return set(result.scalars().all())
+
+    async def save_results(self, logs: list[dict]) -> None:
+        """Record send outcomes on claimed logs in one multi-row upsert."""
+        if not logs:
+            return
+        stmt = pg_insert(BroadcastLog).values(logs)
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[BroadcastLog.broadcast_id, BroadcastLog.lead_id],
+            set_={
+                "status": stmt.excluded.status,
+                "error": stmt.excluded.error,
+                "wa_message_id": stmt.excluded.wa_message_id,
+            },
+        ))
+
+    async def release_claims(self, broadcast_id: int, lead_ids: list[int]) -> None:
+        """Drop pending claims for leads that were never sent, so a resumed run picks them up."""
+        if lead_ids:
+            await self.db.execute(delete(BroadcastLog).where(
+                BroadcastLog.broadcast_id == broadcast_id,
+                BroadcastLog.lead_id.in_(lead_ids),
+                BroadcastLog.status == LOG_PENDING,
+            ))
+
+    async def fail_interrupted(self, broadcast_id: int, lower_id: int = 0, upper_id: int | None = None) -> int:
+        """Close claims in lower_id < lead_id <= upper_id left pending by a run that died mid-send; they are not resent."""
+        query = update(BroadcastLog).where(
+            BroadcastLog.broadcast_id == broadcast_id,
+            BroadcastLog.status == LOG_PENDING,
+            BroadcastLog.lead_id > lower_id,
+        )
+        if upper_id is not None:
+            query = query.where(BroadcastLog.lead_id <= upper_id)
+        result = await self.db.execute(
+            query.values(status=LOG_FAILED, error="Interrupted before the send was confirmed")
+        )
+        return result.rowcount
+
+    async def get_log_counts(self, broadcast_id: int) -> dict[str, int]:
+        result = await self.db.execute(
+            select(BroadcastLog.status, func.count())
+            .where(BroadcastLog.broadcast_id == broadcast_id)
+            .group_by(BroadcastLog.status)
+        )
+        return dict(result.all())
+
     async def get_logs(self, broadcast_id: int) -> list[BroadcastLog]:
         result = await self.db.execute(
             select(BroadcastLog).where(BroadcastLog.broadcast_id == broadcast_id)
@@ -1,8 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, or_, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import joinedload
 from app.models.call import Call
+from app.models.lead import Lead
+from app.core.principal_cache import Principal
 from app.models.user import User, UserRole
 
+LOAD_PROFILES = {
+    "bare": (),
+    "list": (joinedload(Call.lead), joinedload(Call.manager)),
+}
+
+# Sparse fieldsets for GET /calls?fields=...&expand=...
+SPARSE_FIELDS = {column.key: column for column in Call.__table__.columns}
+SPARSE_EXPANSIONS = {
+    "lead": (Lead.name.label("lead_name"),),
+    "manager": (User.name.label("manager_name"),),
+}
+SPARSE_JOINS = {
+    "lead": (Lead, Lead.id == Call.lead_id),
+    "manager": (User, User.id == Call.manager_id),
+}
+
 
 class CallRepository:
     def __init__(self, db: AsyncSession):
@@ -14,22 +34,45 @@ class CallRepository:
 
     async def get_all(
         self,
-        current_user: User,
+        current_user: Principal,
         lead_id: int | None = None,
         direction: str | None = None,
         limit: int = 100,
         offset: int = 0,
+        profile: str = "list",
     ) -> list[Call]:
-        query = select(Call)
+        query = self._list_query(
+            select(Call).options(*LOAD_PROFILES[profile]), current_user, lead_id, direction, limit, offset
+        )
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def get_rows(
+        self,
+        current_user: Principal,
+        fields: list[str],
+        expand: list[str] | None = None,
+        lead_id: int | None = None,
+        direction: str | None = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> list[dict]:
+        """Sparse variant of get_all: only the requested columns, returned as plain dicts."""
+        query = select(*[SPARSE_FIELDS[name] for name in fields])
+        for name in expand or []:
+            query = query.add_columns(*SPARSE_EXPANSIONS[name]).outerjoin(*SPARSE_JOINS[name])
+        query = self._list_query(query, current_user, lead_id, direction, limit, offset)
+        result = await self.db.execute(query)
+        return [dict(row) for row in result.mappings().all()]
+
+    def _list_query(self, query, current_user: Principal, lead_id: int | None, direction: str | None, limit: int, offset: int):
         if current_user.role == UserRole.MANAGER:
             query = query.where(Call.manager_id == current_user.id)
         if lead_id:
             query = query.where(Call.lead_id == lead_id)
         if direction:
             query = query.where(Call.direction == direction)
-        query = query.order_by(Call.created_at.desc()).limit(limit).offset(offset)
-        result = await self.db.execute(query)
-        return list(result.scalars().all())
+        return query.order_by(Call.created_at.desc()).limit(limit).offset(offset)
 
     async def get_by_sipuni_id(self, sipuni_call_id: str) -> Call | None:
         result = await self.db.execute(
@@ -37,6 +80,33 @@ class CallRepository:
         )
         return result.scalar_one_or_none()
 
+    async def upsert_from_webhook(self, values: dict, final: bool) -> tuple[Call, bool] | None:
+        """Insert keyed on sipuni_call_id; returns (call, inserted), or None when the event adds nothing new.
+
+        A final event completes a call an earlier event created, but only if it changes something.
+        """
+        stmt = pg_insert(Call).values(**values)
+        if final:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Call.sipuni_call_id],
+                set_={
+                    "duration": stmt.excluded.duration,
+                    "recording_url": stmt.excluded.recording_url,
+                    "result": stmt.excluded.result,
+                },
+                where=or_(
+                    Call.duration.is_distinct_from(stmt.excluded.duration),
+                    Call.recording_url.is_distinct_from(stmt.excluded.recording_url),
+                    Call.result.is_distinct_from(stmt.excluded.result),
+                ),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[Call.sipuni_call_id])
+        # xmax is 0 only for a freshly inserted row version, not for one the conflict branch updated
+        result = await self.db.execute(stmt.returning(Call, literal_column("xmax = 0").label("inserted")))
+        row = result.one_or_none()
+        return (row[0], row.inserted) if row else None
+
     async def create(self, call: Call) -> Call:
         self.db.add(call)
         await self.db.flush()
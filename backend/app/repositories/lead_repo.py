@@ -1,15 +1,105 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
-from app.models.lead import Lead
+import re
+from datetime import datetime
+from sqlalchemy import select, update, func, or_, tuple_, literal, literal_column, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import joinedload, selectinload
+from app.models.lead import Lead, PHONE_DIGITS_SQL
+from app.models.pipeline import Stage
+from app.core.principal_cache import Principal
 from app.models.user import User, UserRole
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
+
+# Relationship loading per response shape. Relationships are noload on the model,
+# so anything a response needs has to be requested through a profile.
+LOAD_PROFILES = {
+    "bare": (),
+    "list": (selectinload(Lead.stage), selectinload(Lead.manager)),
+    "detail": (joinedload(Lead.stage), joinedload(Lead.manager)),
+}
+
+EXPORT_COLUMNS = (
+    Lead.id, Lead.name, Lead.phone, Lead.source, Lead.language, Lead.stage_id, Lead.manager_id,
+    Lead.tags, Lead.is_returning, Lead.created_at, Lead.updated_at, Lead.last_activity_at,
+)
+
+# All a broadcast needs per recipient
+SEGMENT_COLUMNS = (Lead.id, Lead.phone, Lead.language)
+
+# Sparse fieldsets for GET /leads?fields=...&expand=...
+SPARSE_FIELDS = {column.key: column for column in EXPORT_COLUMNS}
+SPARSE_EXPANSIONS = {
+    "stage": (
+        Stage.id.label("stage__id"), Stage.pipeline_id.label("stage__pipeline_id"), Stage.name.label("stage__name"),
+        Stage.position.label("stage__position"), Stage.color.label("stage__color"),
+    ),
+    "manager": (
+        User.id.label("manager__id"), User.email.label("manager__email"), User.name.label("manager__name"),
+        User.role.label("manager__role"), User.is_active.label("manager__is_active"),
+        User.created_at.label("manager__created_at"),
+    ),
+}
+SPARSE_JOINS = {
+    "stage": (Stage, Stage.id == Lead.stage_id),
+    "manager": (User, User.id == Lead.manager_id),
+}
+
+PHONE_QUERY_RE = re.compile(r"^\+?[\d\s()-]+$")
+
+TAG_PREDICATES = ("any", "all", "none")
+
+
+def normalize_tag_filter(raw) -> dict | None:
+    """Turn a tag list (any-of) or {"any"|"all"|"none": list or comma string} into {predicate: [tags]}."""
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if isinstance(raw, list):
+        raw = {"any": raw}
+    if not isinstance(raw, dict):
+        return None
+    tags = {}
+    for predicate in TAG_PREDICATES:
+        values = raw.get(predicate) or []
+        if isinstance(values, str):
+            values = values.split(",")
+        values = [str(v).strip() for v in values if str(v).strip()]
+        if values:
+            tags[predicate] = values
+    return tags or None
+
+
+def tag_conditions(tags: dict | None) -> list:
+    # ?| and ?& are served by the GIN index on leads.tags; none-of is a negated any-of
+    if not tags:
+        return []
+    conditions = []
+    if tags.get("any"):
+        conditions.append(Lead.tags.op("?|")(literal(tags["any"], ARRAY(Text))))
+    if tags.get("all"):
+        conditions.append(Lead.tags.op("?&")(literal(tags["all"], ARRAY(Text))))
+    if tags.get("none"):
+        conditions.append(or_(Lead.tags.is_(None), ~Lead.tags.op("?|")(literal(tags["none"], ARRAY(Text)))))
+    return conditions
 
 
 class LeadRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_by_id(self, lead_id: int) -> Lead | None:
-        result = await self.db.execute(select(Lead).where(Lead.id == lead_id))
+    def _select(self, profile: str = "bare"):
+        return select(Lead).options(*LOAD_PROFILES[profile])
+
+    async def _reload(self, lead: Lead, profile: str) -> Lead:
+        if not LOAD_PROFILES[profile]:
+            await self.db.refresh(lead)
+            return lead
+        result = await self.db.execute(
+            self._select(profile).where(Lead.id == lead.id).execution_options(populate_existing=True)
+        )
+        return result.scalar_one()
+
+    async def get_by_id(self, lead_id: int, profile: str = "bare") -> Lead | None:
+        result = await self.db.execute(self._select(profile).where(Lead.id == lead_id))
         return result.scalar_one_or_none()
 
     async def get_by_phone(self, phone: str) -> Lead | None:
@@ -18,15 +108,81 @@ class LeadRepository:
 
     async def get_all(
         self,
-        current_user: User,
+        current_user: Principal,
         stage_id: int | None = None,
         manager_id: int | None = None,
         source: str | None = None,
+        tags: dict | None = None,
         q: str | None = None,
         limit: int = 100,
         offset: int = 0,
+        cursor: str | None = None,
+        profile: str = "list",
     ) -> list[Lead]:
-        query = select(Lead)
+        query = self._list_query(
+            self._select(profile), current_user, stage_id, manager_id, source, tags, q, limit, offset, cursor
+        )
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def get_rows(
+        self,
+        current_user: Principal,
+        fields: list[str],
+        expand: list[str] | None = None,
+        stage_id: int | None = None,
+        manager_id: int | None = None,
+        source: str | None = None,
+        tags: dict | None = None,
+        q: str | None = None,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> list[dict]:
+        """Sparse variant of get_all: only the requested columns, returned as plain dicts."""
+        columns = [SPARSE_FIELDS[name] for name in fields]
+        query = select(*columns)
+        for name in expand or []:
+            query = query.add_columns(*SPARSE_EXPANSIONS[name]).outerjoin(*SPARSE_JOINS[name])
+        query = self._list_query(query, current_user, stage_id, manager_id, source, tags, q, limit, offset, cursor)
+        result = await self.db.execute(query)
+        return [dict(row) for row in result.mappings().all()]
+
+    def _list_query(
+        self,
+        query,
+        current_user: Principal,
+        stage_id: int | None,
+        manager_id: int | None,
+        source: str | None,
+        tags: dict | None,
+        q: str | None,
+        limit: int,
+        offset: int,
+        cursor: str | None,
+    ):
+        query = self._apply_filters(query, current_user, stage_id, manager_id, source, tags)
+        if q:
+            if cursor:
+                raise InvalidCursorError("Search results are ranked and paged by offset")
+            return self._search(query, q).limit(limit).offset(offset)
+        if cursor:
+            # Keyset mode: continue strictly after the (updated_at, id) of the previous page
+            updated_at, lead_id = decode_cursor(cursor, datetime, int)
+            query = query.where(tuple_(Lead.updated_at, Lead.id) < tuple_(updated_at, lead_id))
+        else:
+            query = query.offset(offset)
+        return query.order_by(Lead.updated_at.desc(), Lead.id.desc()).limit(limit)
+
+    def _apply_filters(
+        self,
+        query,
+        current_user: Principal,
+        stage_id: int | None = None,
+        manager_id: int | None = None,
+        source: str | None = None,
+        tags: dict | None = None,
+    ):
         if current_user.role == UserRole.MANAGER:
             query = query.where(Lead.manager_id == current_user.id)
         if stage_id:
@@ -35,22 +191,102 @@ class LeadRepository:
             query = query.where(Lead.manager_id == manager_id)
         if source:
             query = query.where(Lead.source == source)
-        if q:
-            query = query.where(or_(Lead.name.ilike(f"%{q}%"), Lead.phone.ilike(f"%{q}%")))
-        query = query.order_by(Lead.updated_at.desc()).limit(limit).offset(offset)
-        result = await self.db.execute(query)
-        return list(result.scalars().all())
+        for condition in tag_conditions(tags):
+            query = query.where(condition)
+        return query
+
+    async def stream_rows(
+        self,
+        current_user: Principal,
+        stage_id: int | None = None,
+        manager_id: int | None = None,
+        source: str | None = None,
+        tags: dict | None = None,
+        batch_size: int = 1000,
+    ):
+        """Yield flat column rows in batches from a server-side cursor, without building ORM objects."""
+        query = self._apply_filters(
+            select(*EXPORT_COLUMNS), current_user, stage_id, manager_id, source, tags
+        ).order_by(Lead.id)
+        result = await self.db.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield rows
+
+    def _search(self, query, q: str):
+        q = q.strip()
+        digits = re.sub(r"\D", "", q)
+        if digits and PHONE_QUERY_RE.match(q):
+            # Phone typing fast path: prefix range on the digits-only index. The
+            # ~>=~/~<~ operators are the ones text_pattern_ops serves, and unlike
+            # LIKE they stay indexable when the pattern is a bind parameter.
+            phone_digits = literal_column(PHONE_DIGITS_SQL)
+            upper = digits[:-1] + chr(ord(digits[-1]) + 1)
+            query = query.where(phone_digits.op("~>=~")(digits), phone_digits.op("~<~")(upper))
+            query = query.order_by(Lead.updated_at.desc(), Lead.id.desc())
+        else:
+            # Substring and fuzzy name matches, both served by the trigram GIN index
+            pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            query = query.where(or_(Lead.name.ilike(pattern, escape="\\"), Lead.name.op("%")(q)))
+            query = query.order_by(func.similarity(Lead.name, q).desc(), Lead.updated_at.desc(), Lead.id.desc())
+        return query
+
+    @staticmethod
+    def next_cursor(leads: list, limit: int) -> str | None:
+        if len(leads) < limit:
+            return None
+        last = leads[-1]
+        if isinstance(last, dict):
+            return encode_cursor(last["updated_at"], last["id"])
+        return encode_cursor(last.updated_at, last.id)
 
-    async def create(self, lead: Lead) -> Lead:
+    async def create(self, lead: Lead, profile: str = "bare") -> Lead:
         self.db.add(lead)
         await self.db.flush()
-        await self.db.refresh(lead)
-        return lead
+        return await self._reload(lead, profile)
 
-    async def update(self, lead: Lead) -> Lead:
+    async def update(self, lead: Lead, profile: str = "bare") -> Lead:
         await self.db.flush()
-        await self.db.refresh(lead)
-        return lead
+        return await self._reload(lead, profile)
+
+    async def lock_for_update(self, lead_ids: list[int], user: Principal) -> list:
+        """Lock the leads the user may modify and return their (id, stage_id, manager_id) before the change."""
+        query = select(Lead.id, Lead.stage_id, Lead.manager_id).where(Lead.id.in_(lead_ids))
+        if user.role == UserRole.MANAGER:
+            query = query.where(Lead.manager_id == user.id)
+        result = await self.db.execute(query.order_by(Lead.id).with_for_update())
+        return list(result.all())
+
+    async def bulk_update(self, lead_ids: list[int], **values) -> None:
+        await self.db.execute(
+            update(Lead)
+            .where(Lead.id.in_(lead_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_board(self, pipeline_id: int, user: Principal, per_stage: int) -> list:
+        """First `per_stage` leads of every stage plus the stage totals, in one window-function query."""
+        ranked = (
+            select(
+                Lead.id, Lead.name, Lead.phone, Lead.source, Lead.stage_id, Lead.manager_id,
+                User.name.label("manager_name"), Lead.tags, Lead.is_returning,
+                Lead.last_activity_at, Lead.updated_at,
+                func.row_number().over(
+                    partition_by=Lead.stage_id, order_by=(Lead.updated_at.desc(), Lead.id.desc())
+                ).label("rn"),
+                func.count().over(partition_by=Lead.stage_id).label("stage_total"),
+            )
+            .join(Stage, Stage.id == Lead.stage_id)
+            .outerjoin(User, User.id == Lead.manager_id)
+            .where(Stage.pipeline_id == pipeline_id)
+        )
+        if user.role == UserRole.MANAGER:
+            ranked = ranked.where(Lead.manager_id == user.id)
+        ranked = ranked.subquery()
+        result = await self.db.execute(
+            select(ranked).where(ranked.c.rn <= per_stage).order_by(ranked.c.stage_id, ranked.c.rn)
+        )
+        return list(result.all())
 
     async def count_by_stage(self) -> dict:
         result = await self.db.execute(
@@ -74,21 +310,53 @@ class LeadRepository:
         result = await self.db.execute(select(func.count(Lead.id)))
         return result.scalar() or 0
 
-    async def get_by_segment(self, segment: dict) -> list[Lead]:
-        query = select(Lead)
+    @staticmethod
+    def _segment_filters(query, segment: dict):
         if segment.get("source"):
             query = query.where(Lead.source == segment["source"])
         if segment.get("language"):
             query = query.where(Lead.language == segment["language"])
-        if segment.get("tags"):
-            pass  # JSON filtering varies by DB
+        for condition in tag_conditions(normalize_tag_filter(segment.get("tags"))):
+            query = query.where(condition)
         if segment.get("stage_id"):
             query = query.where(Lead.stage_id == segment["stage_id"])
-        result = await self.db.execute(query)
+        return query
+
+    async def count_segment(self, segment: dict) -> int:
+        return await self.db.scalar(self._segment_filters(select(func.count(Lead.id)), segment))
+
+    async def segment_boundaries(self, segment: dict, every: int) -> list[int]:
+        """Ids of every `every`-th segment lead in id order: the upper bounds of equal-sized id ranges."""
+        numbered = self._segment_filters(
+            select(Lead.id, func.row_number().over(order_by=Lead.id).label("n")), segment
+        ).subquery()
+        result = await self.db.execute(select(numbered.c.id).where(numbered.c.n % every == 0).order_by(numbered.c.id))
         return list(result.scalars().all())
 
-    async def check_access(self, lead_id: int, user: User) -> Lead | None:
-        lead = await self.get_by_id(lead_id)
+    async def iter_segment(self, segment: dict, chunk_size: int = 1000, after_id: int = 0, up_to: int | None = None):
+        """Yield the segment as (id, phone, language) rows in id-ordered keyset chunks, optionally up to an id.
+
+        Each chunk is its own short query, so the caller can commit between chunks
+        and memory stays bounded by chunk_size whatever the segment size.
+        """
+        query = self._segment_filters(select(*SEGMENT_COLUMNS), segment).order_by(Lead.id).limit(chunk_size)
+        if up_to is not None:
+            query = query.where(Lead.id <= up_to)
+        while True:
+            rows = (await self.db.execute(query.where(Lead.id > after_id))).all()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1].id
+
+    async def touch_activity(self, lead_ids: list[int], at: datetime) -> None:
+        if lead_ids:
+            await self.db.execute(update(Lead).where(Lead.id.in_(lead_ids)).values(last_activity_at=at))
+
+    async def check_access(self, lead_id: int, user: Principal, profile: str = "bare") -> Lead | None:
+        lead = await self.get_by_id(lead_id, profile)
         if not lead:
             return None
         if user.role == UserRole.MANAGER and lead.manager_id != user.id:
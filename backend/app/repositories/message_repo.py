@@ -1,82 +1,216 @@
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, and_
-from app.models.message import Message, SenderType
+from sqlalchemy import select, insert, update, values, column, case, cast, func, tuple_, String, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.message import Message, LeadDialogState, SenderType, MessageType, MessageStatus
 from app.models.lead import Lead
+from app.core.principal_cache import Principal
 from app.models.user import User, UserRole
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
+
+DIALOG_PREVIEW_LENGTH = 255
+
+# Delivery statuses only move forward through this order
+STATUS_RANK = {
+    MessageStatus.SENT: 1,
+    MessageStatus.DELIVERED: 2,
+    MessageStatus.READ: 3,
+    MessageStatus.FAILED: 4,
+}
 
 
 class MessageRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_by_lead(self, lead_id: int, limit: int = 100, offset: int = 0) -> list[Message]:
-        result = await self.db.execute(
-            select(Message)
-            .where(Message.lead_id == lead_id)
-            .order_by(Message.created_at.asc())
-            .limit(limit)
-            .offset(offset)
-        )
+    async def get_by_lead(
+        self,
+        lead_id: int,
+        limit: int = 50,
+        before_id: int | None = None,
+        after_id: int | None = None,
+    ) -> list[Message]:
+        """Newest-first page of a lead's history, optionally strictly before or after a known message."""
+        query = select(Message).where(Message.lead_id == lead_id)
+        anchor_id = before_id or after_id
+        if anchor_id:
+            anchor = (await self.db.execute(
+                select(Message.created_at, Message.id).where(Message.id == anchor_id, Message.lead_id == lead_id)
+            )).one_or_none()
+            if not anchor:
+                raise InvalidCursorError("Unknown message id")
+            key = tuple_(Message.created_at, Message.id)
+            if after_id:
+                # Walk forward from the anchor so a burst of new messages comes back without gaps
+                result = await self.db.execute(
+                    query.where(key > tuple_(*anchor))
+                    .order_by(Message.created_at.asc(), Message.id.asc())
+                    .limit(limit)
+                )
+                return list(reversed(result.scalars().all()))
+            query = query.where(key < tuple_(*anchor))
+        result = await self.db.execute(query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit))
         return list(result.scalars().all())
 
     async def create(self, message: Message) -> Message:
         self.db.add(message)
         await self.db.flush()
         await self.db.refresh(message)
+        await self.touch_dialog(message)
+        return message
+
+    async def create_many(self, messages: list[dict]) -> list[int]:
+        """Insert outbound campaign messages (one per lead) as multi-row INSERTs and move their dialogs forward.
+
+        Rows must carry created_at; returns the new ids in input order.
+        """
+        if not messages:
+            return []
+        result = await self.db.execute(
+            insert(Message).returning(Message.id, sort_by_parameter_order=True), messages,
+        )
+        ids = list(result.scalars().all())
+        await self.touch_dialogs_outbound([{**message, "id": id_} for message, id_ in zip(messages, ids)])
+        return ids
+
+    async def create_if_new(self, message: Message) -> Message | None:
+        """Insert keyed on wa_message_id; returns None when that delivery is already stored."""
+        values = {
+            column.key: getattr(message, column.key)
+            for column in Message.__table__.columns
+            if getattr(message, column.key) is not None
+        }
+        result = await self.db.execute(
+            pg_insert(Message).values(**values)
+            .on_conflict_do_nothing(index_elements=[Message.wa_message_id])
+            .returning(Message)
+        )
+        message = result.scalar_one_or_none()
+        if message:
+            await self.touch_dialog(message)
         return message
 
+    async def touch_dialog(self, message: Message) -> None:
+        """Upsert the lead's inbox row for a just-inserted message, in the caller's transaction.
+
+        unread_count is the number of client messages since the manager's last direct reply. A message
+        older than the row's latest (its transaction committed late) leaves the row as it is.
+        """
+        incoming = message.sender_type == SenderType.CLIENT
+        # A manager's direct reply means the dialog has been read; templates and broadcasts don't
+        replied = message.sender_type == SenderType.MANAGER and message.type == MessageType.TEXT
+        stmt = pg_insert(LeadDialogState).values(
+            lead_id=message.lead_id,
+            last_message_id=message.id,
+            last_message_preview=(message.content or "")[:DIALOG_PREVIEW_LENGTH],
+            last_message_at=message.created_at,
+            unread_count=1 if incoming else 0,
+        )
+        if incoming:
+            unread = LeadDialogState.unread_count + 1
+        elif replied:
+            unread = 0
+        else:
+            unread = LeadDialogState.unread_count
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[LeadDialogState.lead_id],
+            set_={
+                "last_message_id": stmt.excluded.last_message_id,
+                "last_message_preview": stmt.excluded.last_message_preview,
+                "last_message_at": stmt.excluded.last_message_at,
+                "unread_count": unread,
+            },
+            where=LeadDialogState.last_message_at <= stmt.excluded.last_message_at,
+        ))
+
+    async def touch_dialogs_outbound(self, messages: list[dict]) -> None:
+        """Multi-row inbox upsert for outbound messages (at most one per lead); unread counts are kept."""
+        stmt = pg_insert(LeadDialogState).values([
+            {
+                "lead_id": message["lead_id"],
+                "last_message_id": message["id"],
+                "last_message_preview": (message["content"] or "")[:DIALOG_PREVIEW_LENGTH],
+                "last_message_at": message["created_at"],
+                "unread_count": 0,
+            }
+            for message in messages
+        ])
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[LeadDialogState.lead_id],
+            set_={
+                "last_message_id": stmt.excluded.last_message_id,
+                "last_message_preview": stmt.excluded.last_message_preview,
+                "last_message_at": stmt.excluded.last_message_at,
+            },
+            where=LeadDialogState.last_message_at <= stmt.excluded.last_message_at,
+        ))
+
     async def get_by_wa_id(self, wa_message_id: str) -> Message | None:
         result = await self.db.execute(
             select(Message).where(Message.wa_message_id == wa_message_id)
         )
         return result.scalar_one_or_none()
 
-    async def update_status(self, wa_message_id: str, status) -> Message | None:
-        msg = await self.get_by_wa_id(wa_message_id)
-        if msg:
-            msg.status = status
-            await self.db.flush()
-        return msg
+    async def apply_statuses(self, statuses: dict[str, MessageStatus]) -> int:
+        """Apply delivery statuses keyed by wa_message_id in one UPDATE ... FROM (VALUES ...).
 
-    async def get_dialogs(self, current_user: User) -> list[dict]:
-        from sqlalchemy import case, literal_column
-        subq = (
-            select(
-                Message.lead_id,
-                func.max(Message.created_at).label("last_at"),
-                func.max(Message.content).label("last_content"),
-                func.count(
-                    case(
-                        (and_(Message.sender_type == SenderType.CLIENT, Message.status != "read"), Message.id),
-                        else_=None,
-                    )
-                ).label("unread"),
+        A status only moves forward, so a late "delivered" never overwrites "read".
+        """
+        if not statuses:
+            return 0
+        incoming = values(
+            column("wa_message_id", String), column("status", String), column("rank", Integer), name="incoming",
+        ).data([(wa_id, status.name, STATUS_RANK[status]) for wa_id, status in statuses.items()])
+        result = await self.db.execute(
+            update(Message)
+            .where(
+                Message.wa_message_id == incoming.c.wa_message_id,
+                case(*((Message.status == status, rank) for status, rank in STATUS_RANK.items()), else_=0)
+                < incoming.c.rank,
             )
-            .group_by(Message.lead_id)
-            .subquery()
+            .values(status=cast(incoming.c.status, Message.status.type))
+            .execution_options(synchronize_session=False)
         )
+        return result.rowcount
+
+    async def get_dialogs(self, current_user: Principal, limit: int = 100, cursor: str | None = None) -> list[dict]:
         query = (
-            select(Lead, subq.c.last_at, subq.c.last_content, subq.c.unread)
-            .join(subq, Lead.id == subq.c.lead_id)
-            .order_by(desc(subq.c.last_at))
+            select(
+                LeadDialogState.lead_id, Lead.name, Lead.phone, Lead.manager_id, User.name.label("manager_name"),
+                LeadDialogState.last_message_preview, LeadDialogState.last_message_at, LeadDialogState.unread_count,
+            )
+            .join(Lead, Lead.id == LeadDialogState.lead_id)
+            .outerjoin(User, User.id == Lead.manager_id)
+            .order_by(LeadDialogState.last_message_at.desc(), LeadDialogState.lead_id.desc())
+            .limit(limit)
         )
         if current_user.role == UserRole.MANAGER:
             query = query.where(Lead.manager_id == current_user.id)
+        if cursor:
+            last_at, lead_id = decode_cursor(cursor, datetime, int)
+            query = query.where(
+                tuple_(LeadDialogState.last_message_at, LeadDialogState.lead_id) < tuple_(last_at, lead_id)
+            )
         result = await self.db.execute(query)
-        dialogs = []
-        for row in result.all():
-            lead = row[0]
-            dialogs.append({
-                "lead_id": lead.id,
-                "lead_name": lead.name,
-                "lead_phone": lead.phone,
-                "last_message": row[2],
-                "last_message_at": row[1],
-                "unread_count": row[3] or 0,
-                "manager_id": lead.manager_id,
-                "manager_name": lead.manager.name if lead.manager else None,
-            })
-        return dialogs
+        return [
+            {
+                "lead_id": row.lead_id,
+                "lead_name": row.name,
+                "lead_phone": row.phone,
+                "last_message": row.last_message_preview,
+                "last_message_at": row.last_message_at,
+                "unread_count": row.unread_count,
+                "manager_id": row.manager_id,
+                "manager_name": row.manager_name,
+            }
+            for row in result.all()
+        ]
+
+    @staticmethod
+    def next_dialog_cursor(dialogs: list[dict], limit: int) -> str | None:
+        if len(dialogs) < limit:
+            return None
+        return encode_cursor(dialogs[-1]["last_message_at"], dialogs[-1]["lead_id"])
 
     async def count_total(self) -> int:
         result = await self.db.execute(select(func.count(Message.id)))
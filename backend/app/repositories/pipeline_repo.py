@@ -1,22 +1,33 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from app.models.pipeline import Pipeline, Stage
 
+# Pipeline.stages and Stage.leads are noload on the model. PipelineOut needs
+# the stages but never their leads.
+LOAD_PROFILES = {
+    "bare": (),
+    "list": (selectinload(Pipeline.stages),),
+}
+
 
 class PipelineRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_all(self) -> list[Pipeline]:
-        result = await self.db.execute(select(Pipeline).order_by(Pipeline.id))
+    def _select(self, profile: str = "bare"):
+        return select(Pipeline).options(*LOAD_PROFILES[profile])
+
+    async def get_all(self, profile: str = "list") -> list[Pipeline]:
+        result = await self.db.execute(self._select(profile).order_by(Pipeline.id))
         return list(result.scalars().all())
 
-    async def get_by_id(self, pipeline_id: int) -> Pipeline | None:
-        result = await self.db.execute(select(Pipeline).where(Pipeline.id == pipeline_id))
+    async def get_by_id(self, pipeline_id: int, profile: str = "bare") -> Pipeline | None:
+        result = await self.db.execute(self._select(profile).where(Pipeline.id == pipeline_id))
         return result.scalar_one_or_none()
 
-    async def get_default(self) -> Pipeline | None:
-        result = await self.db.execute(select(Pipeline).where(Pipeline.is_default.is_(True)))
+    async def get_default(self, profile: str = "bare") -> Pipeline | None:
+        result = await self.db.execute(self._select(profile).where(Pipeline.is_default.is_(True)))
         return result.scalar_one_or_none()
 
     async def create(self, pipeline: Pipeline) -> Pipeline:
@@ -1,22 +1,32 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
 from app.models.user import User, UserRole
 
+# User.leads is noload on the model; UserOut never needs it.
+LOAD_PROFILES = {
+    "bare": (),
+    "with_leads": (selectinload(User.leads),),
+}
+
 
 class UserRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_by_id(self, user_id: int) -> User | None:
-        result = await self.db.execute(select(User).where(User.id == user_id))
+    def _select(self, profile: str = "bare"):
+        return select(User).options(*LOAD_PROFILES[profile])
+
+    async def get_by_id(self, user_id: int, profile: str = "bare") -> User | None:
+        result = await self.db.execute(self._select(profile).where(User.id == user_id))
         return result.scalar_one_or_none()
 
     async def get_by_email(self, email: str) -> User | None:
         result = await self.db.execute(select(User).where(User.email == email))
         return result.scalar_one_or_none()
 
-    async def get_all(self, is_active: bool | None = None) -> list[User]:
-        q = select(User).order_by(User.created_at.desc())
+    async def get_all(self, is_active: bool | None = None, profile: str = "bare") -> list[User]:
+        q = self._select(profile).order_by(User.created_at.desc())
         if is_active is not None:
             q = q.where(User.is_active == is_active)
         result = await self.db.execute(q)
@@ -45,3 +55,12 @@ class UserRepository:
             select(func.count(Lead.id)).where(Lead.manager_id == manager_id)
         )
         return result.scalar() or 0
+
+    async def get_manager_lead_counts(self, manager_ids: list[int]) -> dict[int, int]:
+        from app.models.lead import Lead
+        result = await self.db.execute(
+            select(Lead.manager_id, func.count(Lead.id))
+            .where(Lead.manager_id.in_(manager_ids))
+            .group_by(Lead.manager_id)
+        )
+        return {row[0]: row[1] for row in result.all()}
@@ -0,0 +1,47 @@
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from app.models.webhook import WebhookInbox, WebhookSource
+
+
+class WebhookInboxRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(self, source: WebhookSource, payload: dict) -> WebhookInbox:
+        item = WebhookInbox(source=source, payload=payload)
+        self.db.add(item)
+        await self.db.flush()
+        return item
+
+    async def claim_batch(self, limit: int, max_attempts: int) -> list[WebhookInbox]:
+        # SKIP LOCKED lets several workers drain the inbox without handing out the same row twice
+        result = await self.db.execute(
+            select(WebhookInbox)
+            .where(WebhookInbox.processed_at.is_(None), WebhookInbox.attempts < max_attempts)
+            .order_by(WebhookInbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+    async def get_stats(self, max_attempts: int) -> list[dict]:
+        """Pending depth, oldest pending receipt and dead-lettered count per source."""
+        pending = WebhookInbox.processed_at.is_(None)
+        result = await self.db.execute(
+            select(
+                WebhookInbox.source,
+                func.count().filter(WebhookInbox.attempts < max_attempts).label("depth"),
+                func.min(WebhookInbox.received_at).filter(WebhookInbox.attempts < max_attempts).label("oldest"),
+                func.count().filter(WebhookInbox.attempts >= max_attempts).label("dead"),
+            )
+            .where(pending)
+            .group_by(WebhookInbox.source)
+        )
+        return [row._asdict() for row in result.all()]
+
+    async def purge_processed(self, before: datetime) -> int:
+        result = await self.db.execute(
+            delete(WebhookInbox).where(WebhookInbox.processed_at < before)
+        )
+        return result.rowcount
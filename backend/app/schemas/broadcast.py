@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.models.broadcast import BroadcastStatus
 
 
@@ -9,7 +9,11 @@ class BroadcastOut(BaseModel):
     segment: dict | None = None
     template_name: str | None = None
     body: str
+    concurrency: int | None = None
     status: BroadcastStatus
+    total_count: int | None = None
+    sent_count: int = 0
+    failed_count: int = 0
     scheduled_at: datetime | None = None
     created_by: int
     created_at: datetime
@@ -23,6 +27,7 @@ class BroadcastCreate(BaseModel):
     segment: dict | None = None
     template_name: str | None = None
     body: str = ""
+    concurrency: int | None = Field(None, ge=1, le=64)
 
 
 class BroadcastSchedule(BaseModel):
@@ -19,6 +19,15 @@ class CallOut(BaseModel):
     class Config:
         from_attributes = True
 
+    @classmethod
+    def from_call(cls, call) -> "CallOut":
+        out = cls.model_validate(call)
+        if call.lead:
+            out.lead_name = call.lead.name
+        if call.manager:
+            out.manager_name = call.manager.name
+        return out
+
 
 class ClickToCallRequest(BaseModel):
     phone: str
@@ -1,6 +1,9 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.schemas.user import UserOut
+from app.schemas.message import MessageOut
+from app.schemas.call import CallOut
+from app.schemas.activity import ActivityOut
 
 
 class StageOut(BaseModel):
@@ -34,6 +37,13 @@ class LeadOut(BaseModel):
         from_attributes = True
 
 
+class LeadFullOut(BaseModel):
+    lead: LeadOut
+    messages: list[MessageOut] = []
+    calls: list[CallOut] = []
+    activities: list[ActivityOut] = []
+
+
 class LeadCreate(BaseModel):
     name: str
     phone: str
@@ -53,3 +63,26 @@ class LeadUpdate(BaseModel):
     manager_id: int | None = None
     tags: list | None = None
     is_returning: bool | None = None
+
+
+class LeadBulkUpdate(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=1000)
+    stage_id: int | None = None
+    manager_id: int | None = None
+
+
+class LeadBulkUpdateResult(BaseModel):
+    updated: int
+    not_found: list[int] = []
+
+
+class LeadImportError(BaseModel):
+    row: int
+    error: str
+
+
+class LeadImportResult(BaseModel):
+    total: int
+    created: int
+    failed: int
+    errors: list[LeadImportError] = []
@@ -30,3 +30,30 @@ class StageUpdate(BaseModel):
     name: str | None = None
     position: int | None = None
     color: str | None = None
+
+
+class BoardLeadOut(BaseModel):
+    id: int
+    name: str
+    phone: str
+    source: str
+    stage_id: int
+    manager_id: int | None = None
+    manager_name: str | None = None
+    tags: list | None = None
+    is_returning: bool
+    last_activity_at: datetime | None = None
+    updated_at: datetime
+
+
+class BoardColumnOut(BaseModel):
+    stage: StageOut
+    count: int
+    leads: list[BoardLeadOut] = []
+    # Continue the column with GET /leads?stage_id=<stage.id>&cursor=<next_cursor>
+    next_cursor: str | None = None
+
+
+class BoardOut(BaseModel):
+    pipeline_id: int
+    columns: list[BoardColumnOut] = []
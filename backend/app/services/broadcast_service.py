@@ -1,64 +1,341 @@
+import asyncio
+import httpx
 import logging
-from datetime import datetime, timezone
+import time
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.broadcast import Broadcast, BroadcastLog, BroadcastStatus
-from app.repositories.broadcast_repo import BroadcastRepository
+from app.core.config import get_settings
+from app.core.event_relay import event_relay
+from app.models.broadcast import Broadcast, BroadcastShard, BroadcastStatus
+from app.models.activity import ActivityKind
+from app.models.message import SenderType, MessageType
+from app.models.user import UserRole
+from app.repositories.activity_repo import ActivityRepository
+from app.repositories.broadcast_repo import BroadcastRepository, LOG_SENT, LOG_FAILED
 from app.repositories.lead_repo import LeadRepository
-from app.services.whatsapp_service import WhatsAppService
+from app.repositories.message_repo import MessageRepository
+from app.services.whatsapp_service import WhatsAppService, Delivery
 
 logger = logging.getLogger("atlas_crm.broadcast")
+settings = get_settings()
+
+# A scheduled broadcast whose time came, a freshly started one, or one whose worker died
+RUNNABLE_STATUSES = (BroadcastStatus.SCHEDULED, BroadcastStatus.SENDING)
+
+# (recipient, delivery) after an API answer, (recipient, error) when the send raised;
+# recipients are (id, phone, language) rows from the segment
+SendOutcome = tuple[Row, Delivery | None, str | None]
+
+# Progress is for whoever runs campaigns, not every connected manager
+PROGRESS_ROLES = (UserRole.ADMIN, UserRole.HEAD)
+
+
+class ProgressThrottle:
+    """Lets a progress update through every `interval` seconds or each time another `step` percent is done."""
+
+    def __init__(self, total: int | None, interval: float, step: int):
+        self.total = total or 0
+        self.interval = interval
+        self.step = step
+        self._last_at = time.monotonic()
+        self._last_step = 0
+        self._last_done = 0
+
+    def ready(self, done: int) -> bool:
+        # Shards report concurrently, so an older total can arrive after a newer one
+        if done < self._last_done:
+            return False
+        now = time.monotonic()
+        steps = done * 100 // (self.total * self.step) if self.total and self.step > 0 else 0
+        if steps <= self._last_step and now - self._last_at < self.interval:
+            return False
+        self._last_at = now
+        self._last_step = max(self._last_step, steps)
+        self._last_done = done
+        return True
+
+
+class ProgressCoalescer:
+    """One ProgressThrottle per broadcast for the events its shards publish, wherever they run."""
+
+    def __init__(self, interval: float, step: int):
+        self.interval = interval
+        self.step = step
+        self._throttles: dict[int, ProgressThrottle] = {}
+
+    def admit(self, event: dict) -> bool:
+        """Whether a relayed WS event should reach the sockets; only broadcast progress is thinned out."""
+        if event.get("event") != "broadcast:progress":
+            if event.get("event") == "broadcast:finished":
+                self._throttles.pop(event["data"]["broadcast_id"], None)
+            return True
+        progress = event["data"]
+        throttle = self._throttles.get(progress["broadcast_id"])
+        if throttle is None:
+            throttle = self._throttles[progress["broadcast_id"]] = ProgressThrottle(
+                progress["total"], self.interval, self.step,
+            )
+        return throttle.ready(progress["sent"] + progress["failed"])
+
+
+progress_coalescer = ProgressCoalescer(settings.BROADCAST_PROGRESS_INTERVAL_SECONDS, settings.BROADCAST_PROGRESS_PERCENT_STEP)
+
+
+def _stale_before() -> datetime:
+    """Leases and heartbeats older than this belong to runs that died."""
+    return datetime.now(timezone.utc) - timedelta(seconds=settings.BROADCAST_STALE_AFTER_SECONDS)
 
 
 class BroadcastService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, http: httpx.AsyncClient | None = None):
         self.db = db
         self.broadcast_repo = BroadcastRepository(db)
         self.lead_repo = LeadRepository(db)
-        self.wa_service = WhatsAppService(db)
+        self.message_repo = MessageRepository(db)
+        self.activity_repo = ActivityRepository(db)
+        self.wa_service = WhatsAppService(db, http)
 
-    async def execute_broadcast(self, broadcast_id: int) -> None:
+    async def prepare(self, broadcast_id: int, scheduled_for: datetime | None = None) -> list[int] | None:
+        """Mark the broadcast sending and return its unfinished shards, planning them on the first run.
+
+        Returns None when the broadcast is missing or not in a runnable state, or, for a run
+        scheduled_for a time, when the broadcast is no longer scheduled for exactly that time.
+        """
         broadcast = await self.broadcast_repo.get_by_id(broadcast_id)
         if not broadcast:
             logger.error(f"Broadcast {broadcast_id} not found")
-            return
+            return None
+        if broadcast.status not in RUNNABLE_STATUSES:
+            logger.info(f"Broadcast {broadcast_id} is {broadcast.status.value}, nothing to send")
+            return None
+        if scheduled_for and (broadcast.status != BroadcastStatus.SCHEDULED or broadcast.scheduled_at != scheduled_for):
+            logger.info(f"Broadcast {broadcast_id}: dropping the superseded run scheduled for {scheduled_for}")
+            return None
 
         broadcast.status = BroadcastStatus.SENDING
+        broadcast.heartbeat_at = datetime.now(timezone.utc)
         await self.broadcast_repo.update(broadcast)
 
-        leads = await self.lead_repo.get_by_segment(broadcast.segment or {})
-        total = len(leads)
-        sent = 0
+        shards = await self.broadcast_repo.get_shards(broadcast.id)
+        if not shards:
+            segment = broadcast.segment or {}
+            broadcast.total_count = await self.lead_repo.count_segment(segment)
+            boundaries = await self.lead_repo.segment_boundaries(segment, settings.BROADCAST_SHARD_SIZE)
+            shards = await self.broadcast_repo.create_shards(broadcast.id, boundaries)
+            logger.info(f"Broadcast {broadcast.id}: {broadcast.total_count} leads in {len(shards)} shards")
+        await self.db.commit()
+        return [shard.id for shard in shards if not shard.finished_at]
 
-        for lead in leads:
-            try:
-                if broadcast.template_name:
-                    msg = await self.wa_service.send_template(lead, broadcast.template_name, broadcast.body)
-                else:
-                    msg = await self.wa_service.send_text(lead, broadcast.body)
-
-                log = BroadcastLog(
-                    broadcast_id=broadcast.id,
-                    lead_id=lead.id,
-                    status="sent",
-                    wa_message_id=msg.wa_message_id,
-                )
-                await self.broadcast_repo.create_log(log)
-                sent += 1
-            except Exception as e:
-                logger.error(f"Broadcast msg to lead {lead.id} failed: {e}")
-                log = BroadcastLog(
-                    broadcast_id=broadcast.id,
-                    lead_id=lead.id,
-                    status="failed",
-                    error=str(e),
-                )
-                await self.broadcast_repo.create_log(log)
-
-            from app.api.v1.ws import manager as ws_manager
-            await ws_manager.broadcast_event({
-                "event": "broadcast:progress",
-                "data": {"broadcast_id": broadcast.id, "sent": sent, "total": total},
+    async def run_shard(self, shard_id: int) -> None:
+        """Send one shard from its checkpoint; safe to run again at any point.
+
+        Does nothing while another live run holds the shard: that run finishes it.
+        """
+        shard = await self.broadcast_repo.get_shard(shard_id)
+        broadcast = await self.broadcast_repo.get_by_id(shard.broadcast_id) if shard else None
+        if not broadcast or shard.finished_at or broadcast.status != BroadcastStatus.SENDING:
+            return
+        if not await self.broadcast_repo.lease_shard(shard.id, _stale_before()):
+            logger.info(f"Broadcast {broadcast.id} shard {shard.id} is held by a live run, skipping")
+            await self.db.rollback()
+            return
+        await self.db.commit()
+        await self.db.refresh(shard)
+        try:
+            await self._send_shard(broadcast, shard)
+        except Exception:
+            # Let a retry or a resume take the shard straight away instead of after the lease expires
+            await self.db.rollback()
+            await self.broadcast_repo.release_shard(shard_id)
+            await self.db.commit()
+            raise
+
+    async def _send_shard(self, broadcast: Broadcast, shard: BroadcastShard) -> None:
+        # With the lease held, claims still pending in this shard belong to an attempt that died
+        interrupted = await self.broadcast_repo.fail_interrupted(broadcast.id, shard.lower_id, shard.upper_id)
+        if interrupted:
+            logger.warning(f"Broadcast {broadcast.id} shard {shard.id}: {interrupted} sends of a dead run were left unconfirmed")
+            await self.broadcast_repo.add_counts(broadcast.id, 0, interrupted)
+            await self.db.commit()
+
+        # Workers only talk to the WhatsApp API (paced by the shared rate limit); this
+        # coroutine is the single user of the session and writes finished sends in batches
+        concurrency = broadcast.concurrency or settings.BROADCAST_CONCURRENCY
+        pending: asyncio.Queue[Row | None] = asyncio.Queue(maxsize=concurrency * 2)
+        finished: list[SendOutcome] = []
+        # Claimed but not yet persisted; whatever is left here when the run stops was never sent
+        unsent: set[int] = set()
+        stopped_by: BroadcastStatus | None = None
+
+        async def worker():
+            while (lead := await pending.get()) is not None:
+                outcome = await self._send(broadcast, lead)
+                unsent.discard(lead.id)
+                finished.append(outcome)
+
+        async def flush():
+            nonlocal stopped_by
+            batch = finished.copy()
+            finished.clear()
+            shard.heartbeat_at = datetime.now(timezone.utc)
+            sent, failed = await self._persist(broadcast, batch)
+            await self._publish(broadcast, "broadcast:progress", sent, failed)
+            # Pause and cancel requests are picked up once per write window
+            status = await self.broadcast_repo.get_status(broadcast.id)
+            if status != BroadcastStatus.SENDING:
+                stopped_by = status
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            chunks = self.lead_repo.iter_segment(
+                broadcast.segment or {}, settings.BROADCAST_SEGMENT_CHUNK_SIZE,
+                after_id=shard.last_lead_id or shard.lower_id, up_to=shard.upper_id,
+            )
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    claimed = await self.broadcast_repo.claim_leads(broadcast.id, [lead.id for lead in chunk])
+                    # Claims and checkpoint commit together, before anything in the chunk is sent
+                    shard.last_lead_id = chunk[-1].id
+                    shard.heartbeat_at = datetime.now(timezone.utc)
+                    await self.db.commit()
+                    unsent.update(claimed)
+                    for lead in chunk:
+                        if lead.id not in claimed:
+                            continue
+                        await pending.put(lead)
+                        if len(finished) >= settings.BROADCAST_BATCH_SIZE:
+                            await flush()
+                        if stopped_by:
+                            break
+                    if stopped_by:
+                        break
+            while stopped_by and not pending.empty():
+                pending.get_nowait()
+            for _ in workers:
+                await pending.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        if finished:
+            await flush()
+
+        if unsent:
+            # Unsent claims go back, and the checkpoint moves behind them so a resume finds them
+            await self.broadcast_repo.release_claims(broadcast.id, list(unsent))
+            shard.last_lead_id = min(unsent) - 1
+        elif not stopped_by:
+            shard.finished_at = datetime.now(timezone.utc)
+        shard.heartbeat_at = None
+        await self.db.commit()
+        if stopped_by:
+            logger.info(f"Broadcast {broadcast.id} shard {shard.id} stopped: {stopped_by.value}")
+
+    async def finalize(self, broadcast_id: int, failed: bool = False) -> None:
+        """Settle the counters from the logs and mark the broadcast done once every shard finished.
+
+        With failed (a shard task raised) a broadcast left sending is paused instead, so it can be
+        resumed, unless a shard is still held by a live run that will finish it.
+        """
+        broadcast = await self.broadcast_repo.get_by_id(broadcast_id)
+        if not broadcast:
+            return
+        counts = await self.broadcast_repo.get_log_counts(broadcast.id)
+        broadcast.sent_count = counts.get(LOG_SENT, 0)
+        broadcast.failed_count = counts.get(LOG_FAILED, 0)
+        shards = await self.broadcast_repo.get_shards(broadcast.id)
+        await self.db.flush()
+        if all(shard.finished_at for shard in shards):
+            await self.broadcast_repo.transition(broadcast.id, (BroadcastStatus.SENDING,), BroadcastStatus.DONE)
+        elif (
+            failed
+            and not await self.broadcast_repo.has_live_shards(broadcast.id, _stale_before())
+            and await self.broadcast_repo.transition(broadcast.id, (BroadcastStatus.SENDING,), BroadcastStatus.PAUSED)
+        ):
+            logger.error(f"Broadcast {broadcast.id} paused after a shard failed; resume continues from the checkpoints")
+        await self.db.commit()
+        await self.db.refresh(broadcast)
+        logger.info(
+            f"Broadcast {broadcast.id} {broadcast.status.value}: "
+            f"{broadcast.sent_count} sent, {broadcast.failed_count} failed of {broadcast.total_count}"
+        )
+        await self._publish(broadcast, "broadcast:finished", broadcast.sent_count, broadcast.failed_count)
+
+    async def _send(self, broadcast: Broadcast, lead: Row) -> SendOutcome:
+        if broadcast.template_name:
+            payload = self.wa_service.template_payload(lead.phone, broadcast.template_name, lead.language)
+        else:
+            payload = self.wa_service.text_payload(lead.phone, broadcast.body)
+        try:
+            return lead, await self.wa_service.deliver(payload, bulk=True), None
+        except Exception as e:
+            logger.error(f"Broadcast msg to lead {lead.id} failed: {e}")
+            return lead, None, str(e)
+
+    async def _persist(self, broadcast: Broadcast, batch: list[SendOutcome]) -> tuple[int, int]:
+        """Write one window of finished sends and commit it; returns the broadcast's sent and failed totals."""
+        now = datetime.now(timezone.utc)
+        is_template = bool(broadcast.template_name)
+        content = (broadcast.body or f"[Template: {broadcast.template_name}]") if is_template else broadcast.body
+
+        message_type = MessageType.TEMPLATE if is_template else MessageType.TEXT
+        messages = [
+            {
+                "lead_id": lead.id,
+                "sender_type": SenderType.MANAGER,
+                "type": message_type,
+                "content": content,
+                "status": delivery.status,
+                "wa_message_id": delivery.wa_message_id,
+                "created_at": now,
+            }
+            for lead, delivery, _ in batch
+            if delivery
+        ]
+        message_ids = await self.message_repo.create_many(messages)
+        lead_ids = [message["lead_id"] for message in messages]
+
+        logs = []
+        sent = 0
+        for lead, delivery, error in batch:
+            ok = delivery is not None and delivery.error is None
+            sent += ok
+            logs.append({
+                "broadcast_id": broadcast.id,
+                "lead_id": lead.id,
+                "status": LOG_SENT if ok else LOG_FAILED,
+                "error": error or (delivery.error if delivery else None),
+                "wa_message_id": delivery.wa_message_id if delivery else None,
             })
+        await self.broadcast_repo.save_results(logs)
+        await self.lead_repo.touch_activity(lead_ids, now)
 
-        broadcast.status = BroadcastStatus.DONE
-        await self.broadcast_repo.update(broadcast)
+        if not is_template:
+            await self.activity_repo.create_many([
+                {
+                    "lead_id": lead_id,
+                    "kind": ActivityKind.MESSAGE,
+                    "ref_id": message_id,
+                    "meta": {"direction": "out", "content_preview": content[:100]},
+                    "created_at": now,
+                }
+                for lead_id, message_id in zip(lead_ids, message_ids)
+            ])
+        totals = await self.broadcast_repo.add_counts(broadcast.id, sent, len(batch) - sent)
+        await self.db.commit()
+        return totals
+
+    async def _publish(self, broadcast: Broadcast, event: str, sent: int, failed: int) -> None:
+        # Shards run in Celery workers: events travel to the API processes, which thin them out per broadcast
+        await event_relay.publish(PROGRESS_ROLES, {
+            "event": event,
+            "data": {
+                "broadcast_id": broadcast.id,
+                "status": broadcast.status.value,
+                "sent": sent,
+                "failed": failed,
+                "total": broadcast.total_count,
+            },
+        })
@@ -44,28 +44,71 @@ class DistributionService:
             logger.warning("No active managers for distribution")
             return None
 
-        for rule in rules:
-            if rule.source and rule.source != lead.source:
-                continue
-            if rule.language and rule.language != lead.language:
-                continue
-
+        rule = self._match_rule(lead, rules)
+        if rule:
             if rule.manager_id:
                 specific = await self.user_repo.get_by_id(rule.manager_id)
                 if specific and specific.is_active:
                     return specific
 
-            if rule.algorithm == DistributionAlgorithm.ROUND_ROBIN:
-                return await self._round_robin(managers)
-            elif rule.algorithm == DistributionAlgorithm.LOAD_BASED:
+            if rule.algorithm == DistributionAlgorithm.LOAD_BASED:
                 return await self._load_based(managers)
-            elif rule.algorithm == DistributionAlgorithm.LANGUAGE_BASED:
-                return await self._round_robin(managers)
-            elif rule.algorithm == DistributionAlgorithm.SOURCE_BASED:
-                return await self._round_robin(managers)
 
         return await self._round_robin(managers)
 
+    async def assign_managers(self, leads: list[Lead]) -> None:
+        """Batch form of assign_manager: sets manager_id on every lead with one round of lookups."""
+        managers = await self.user_repo.get_active_managers()
+        if not managers:
+            logger.warning("No active managers for distribution")
+            return
+        rules = await self.rule_repo.get_active()
+        active_users = {u.id: u for u in await self.user_repo.get_all(is_active=True)}
+
+        phones = {lead.phone for lead in leads if lead.phone}
+        previous: dict[str, int] = {}
+        if phones:
+            result = await self.db.execute(
+                select(Lead.phone, Lead.manager_id)
+                .where(Lead.phone.in_(phones), Lead.manager_id.isnot(None))
+            )
+            for phone, manager_id in result.all():
+                previous.setdefault(phone, manager_id)
+
+        loads: dict[int, int] | None = None
+        for lead in leads:
+            prev_id = previous.get(lead.phone)
+            if prev_id in active_users:
+                lead.manager_id = prev_id
+                lead.is_returning = True
+                continue
+
+            manager = None
+            rule = self._match_rule(lead, rules)
+            if rule and rule.manager_id in active_users:
+                manager = active_users[rule.manager_id]
+            elif rule and rule.algorithm == DistributionAlgorithm.LOAD_BASED:
+                if loads is None:
+                    loads = await self.user_repo.get_manager_lead_counts([m.id for m in managers])
+                manager = min(managers, key=lambda m: loads.get(m.id, 0))
+            else:
+                manager = await self._round_robin(managers)
+
+            lead.manager_id = manager.id
+            if loads is not None:
+                loads[manager.id] = loads.get(manager.id, 0) + 1
+            if lead.phone:
+                previous.setdefault(lead.phone, manager.id)
+
+    def _match_rule(self, lead: Lead, rules: list[DistributionRule]) -> DistributionRule | None:
+        for rule in rules:
+            if rule.source and rule.source != lead.source:
+                continue
+            if rule.language and rule.language != lead.language:
+                continue
+            return rule
+        return None
+
     async def _round_robin(self, managers: list[User]) -> User:
         global _round_robin_index
         manager = managers[_round_robin_index % len(managers)]
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+from app.core.config import get_settings
+from app.db.session import async_session
+from app.core.principal_cache import Principal
+from app.repositories.lead_repo import LeadRepository, EXPORT_COLUMNS
+
+settings = get_settings()
+
+EXPORT_HEADER = [column.key for column in EXPORT_COLUMNS]
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+async def stream_lead_export(
+    current_user: Principal,
+    fmt: str,
+    stage_id: int | None = None,
+    manager_id: int | None = None,
+    source: str | None = None,
+    tags: dict | None = None,
+) -> AsyncIterator[bytes]:
+    # The response outlives the request-scoped session, so the export holds its own
+    async with async_session() as db:
+        repo = LeadRepository(db)
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(EXPORT_HEADER)
+            yield buf.getvalue().encode()
+        async for rows in repo.stream_rows(
+            current_user, stage_id=stage_id, manager_id=manager_id, source=source, tags=tags,
+            batch_size=settings.LEAD_EXPORT_BATCH_SIZE,
+        ):
+            if fmt == "csv":
+                buf.seek(0)
+                buf.truncate()
+                writer.writerows([_csv_value(v) for v in row] for row in rows)
+                yield buf.getvalue().encode()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_HEADER, map(_json_value, row))), ensure_ascii=False) + "\n"
+                    for row in rows
+                ).encode()
@@ -0,0 +1,166 @@
+import csv
+import json
+import logging
+from typing import AsyncIterator
+from pydantic import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
+from app.models.lead import Lead
+from app.models.pipeline import Stage
+from app.models.user import User
+from app.models.activity import Activity, ActivityKind
+from app.schemas.lead import LeadCreate
+from app.services.distribution_service import DistributionService
+
+logger = logging.getLogger("atlas_crm.lead_import")
+settings = get_settings()
+
+IMPORT_FIELDS = set(LeadCreate.model_fields)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+            first = False
+            yield text
+    if buffer:
+        yield buffer.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[dict]:
+    header: list[str] | None = None
+    pending = ""
+    async for line in lines:
+        pending = f"{pending}\n{line}" if pending else line
+        # An odd number of quotes means a quoted field continues on the next line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        yield dict(zip(header, values))
+    if pending.strip() and header is not None:
+        yield dict(zip(header, next(csv.reader([pending]))))
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[dict | str]:
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield f"Invalid JSON: {e}"
+            continue
+        yield record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def _clean_csv_record(record: dict) -> dict:
+    data = {k: v.strip() for k, v in record.items() if k in IMPORT_FIELDS and v is not None and v.strip()}
+    if "tags" in data:
+        data["tags"] = [t.strip() for t in data["tags"].split(";") if t.strip()]
+    return data
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    err = e.errors()[0]
+    field = ".".join(str(part) for part in err["loc"])
+    return f"{field}: {err['msg']}" if field else err["msg"]
+
+
+class LeadImportService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.dist_service = DistributionService(db)
+        self.chunk_size = settings.LEAD_IMPORT_CHUNK_SIZE
+
+    async def import_stream(self, chunks: AsyncIterator[bytes], fmt: str, imported_by: str) -> dict:
+        lines = iter_lines(chunks)
+        records = iter_csv_records(lines) if fmt == "csv" else iter_ndjson_records(lines)
+
+        stage_ids = set((await self.db.execute(select(Stage.id))).scalars().all())
+        user_ids = set((await self.db.execute(select(User.id).where(User.is_active.is_(True)))).scalars().all())
+
+        summary = {"total": 0, "created": 0, "failed": 0, "errors": []}
+        batch: list[tuple[int, LeadCreate]] = []
+        row = 0
+        async for record in records:
+            row += 1
+            if isinstance(record, str):
+                self._add_error(summary, row, record)
+                continue
+            try:
+                body = LeadCreate(**(_clean_csv_record(record) if fmt == "csv" else record))
+            except ValidationError as e:
+                self._add_error(summary, row, _format_validation_error(e))
+                continue
+            if body.stage_id and body.stage_id not in stage_ids:
+                self._add_error(summary, row, f"stage_id: unknown stage {body.stage_id}")
+                continue
+            if body.manager_id and body.manager_id not in user_ids:
+                self._add_error(summary, row, f"manager_id: unknown or inactive user {body.manager_id}")
+                continue
+            batch.append((row, body))
+            if len(batch) >= self.chunk_size:
+                await self._insert_batch(batch, summary, imported_by)
+                batch = []
+        if batch:
+            await self._insert_batch(batch, summary, imported_by)
+
+        summary["total"] = row
+        summary["errors"].sort(key=lambda e: e["row"])
+        return summary
+
+    def _add_error(self, summary: dict, row: int, error: str) -> None:
+        summary["failed"] += 1
+        summary["errors"].append({"row": row, "error": error})
+
+    async def _insert_batch(self, batch: list[tuple[int, LeadCreate]], summary: dict, imported_by: str) -> None:
+        leads = [
+            Lead(
+                name=body.name,
+                phone=body.phone,
+                source=body.source,
+                language=body.language,
+                stage_id=body.stage_id,
+                manager_id=body.manager_id,
+                tags=body.tags or [],
+                is_returning=False,
+            )
+            for _, body in batch
+        ]
+        await self.dist_service.assign_managers([lead for lead in leads if not lead.manager_id])
+
+        columns = ("name", "phone", "source", "language", "stage_id", "manager_id", "tags", "is_returning")
+        try:
+            # A savepoint per chunk: a failing chunk is reported row by row and the import goes on
+            async with self.db.begin_nested():
+                result = await self.db.execute(
+                    insert(Lead).returning(Lead.id, sort_by_parameter_order=True),
+                    [{c: getattr(lead, c) for c in columns} for lead in leads],
+                )
+                lead_ids = list(result.scalars().all())
+                await self.db.execute(insert(Activity), [
+                    {
+                        "lead_id": lead_id,
+                        "kind": ActivityKind.NOTE,
+                        "meta": {"text": "Lead imported", "by": imported_by},
+                    }
+                    for lead_id in lead_ids
+                ])
+        except Exception as e:
+            logger.error(f"Lead import chunk failed: {e}")
+            for row, _ in batch:
+                self._add_error(summary, row, "Database error while inserting this chunk")
+            return
+        summary["created"] += len(lead_ids)
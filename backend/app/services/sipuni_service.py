@@ -1,7 +1,10 @@
+import httpx
 import logging
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import get_settings
+from app.core.http import get_http_client
+from app.core.dedup import dedup_checks, remember_on_commit, sipuni_events
 from app.models.call import Call, CallDirection
 from app.models.activity import Activity, ActivityKind
 from app.repositories.call_repo import CallRepository
@@ -11,17 +14,20 @@ from app.repositories.activity_repo import ActivityRepository
 logger = logging.getLogger("atlas_crm.sipuni")
 settings = get_settings()
 
+FINAL_EVENTS = ("call_end", "call.completed", "completed")
+
 
 class SipuniService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, http: httpx.AsyncClient | None = None):
         self.db = db
+        self.http = http or get_http_client()
         self.call_repo = CallRepository(db)
         self.lead_repo = LeadRepository(db)
         self.activity_repo = ActivityRepository(db)
 
     async def handle_webhook(self, payload: dict) -> Call | None:
         event_type = payload.get("event", "")
-        call_id = payload.get("call_id", "")
+        call_id = payload.get("call_id") or None
         phone = payload.get("src_number") or payload.get("dst_number", "")
         direction_str = payload.get("direction", "in")
         duration = int(payload.get("duration", 0))
@@ -29,30 +35,40 @@ class SipuniService:
         result = payload.get("status", "")
         manager_ext = payload.get("ext", "")
 
-        if event_type not in ("call_end", "call.completed", "completed"):
-            existing = await self.call_repo.get_by_sipuni_id(call_id)
-            if existing:
-                return existing
+        final = event_type in FINAL_EVENTS
+        dedup_key = (call_id, event_type)
+        if call_id and dedup_key in sipuni_events:
+            dedup_checks.inc(source="sipuni", result="memory_hit")
+            return None
 
         direction = CallDirection.IN if direction_str in ("in", "incoming") else CallDirection.OUT
 
         lead = await self.lead_repo.get_by_phone(phone) if phone else None
 
-        call = Call(
-            lead_id=lead.id if lead else None,
-            manager_id=lead.manager_id if lead else None,
-            direction=direction,
-            duration=duration,
-            recording_url=recording_url,
-            result=result,
-            sipuni_call_id=call_id,
-        )
-        call = await self.call_repo.create(call)
+        upserted = await self.call_repo.upsert_from_webhook({
+            "lead_id": lead.id if lead else None,
+            "manager_id": lead.manager_id if lead else None,
+            "direction": direction,
+            "duration": duration,
+            "recording_url": recording_url,
+            "result": result,
+            "sipuni_call_id": call_id,
+        }, final=final)
+        if not upserted:
+            dedup_checks.inc(source="sipuni", result="db_hit")
+            sipuni_events.add(dedup_key)
+            return None
+        dedup_checks.inc(source="sipuni", result="new")
+        if call_id:
+            remember_on_commit(self.db, sipuni_events, dedup_key)
 
+        call, inserted = upserted
         if lead:
             lead.last_activity_at = datetime.now(timezone.utc)
             await self.lead_repo.update(lead)
 
+        # A final event completing a call that already exists adds no second activity or notification
+        if lead and inserted:
             await self.activity_repo.create(Activity(
                 lead_id=lead.id,
                 kind=ActivityKind.CALL,
@@ -84,13 +100,11 @@ class SipuniService:
             logger.info(f"[MOCK] Click-to-call: manager={manager_id}, phone={phone}")
             return {"status": "mock_initiated", "phone": phone}
 
-        import httpx
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "https://sipuni.com/api/callback/call",
-                params={
-                    "phone": phone,
-                    "sipuni_api_key": settings.SIPUNI_API_KEY,
-                },
-            )
-            return resp.json()
+        resp = await self.http.post(
+            f"{settings.SIPUNI_API_URL}/callback/call",
+            params={
+                "phone": phone,
+                "sipuni_api_key": settings.SIPUNI_API_KEY,
+            },
+        )
+        return resp.json()
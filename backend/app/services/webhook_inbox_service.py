@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
+from app.core.dedup import pending_marker, discard_pending
+from app.core.metrics import registry
+from app.db.session import async_session
+from app.models.webhook import WebhookSource
+from app.repositories.webhook_repo import WebhookInboxRepository
+from app.services.sipuni_service import SipuniService
+from app.services.whatsapp_service import WhatsAppService
+
+logger = logging.getLogger("atlas_crm.webhook_inbox")
+settings = get_settings()
+
+PURGE_INTERVAL_SECONDS = 300
+
+inbox_processed = registry.counter("webhook_inbox_processed_total", "Inbox payloads handled, by source and outcome")
+inbox_lag = registry.gauge("webhook_inbox_lag_seconds", "Receipt-to-processing delay of the last processed payload")
+inbox_depth = registry.gauge("webhook_inbox_depth", "Payloads waiting to be processed")
+inbox_oldest = registry.gauge("webhook_inbox_oldest_pending_seconds", "Age of the oldest payload waiting to be processed")
+inbox_dead = registry.gauge("webhook_inbox_dead_letters", "Payloads that used up all processing attempts")
+
+
+async def _handle_whatsapp(db: AsyncSession, payload: dict) -> None:
+    await WhatsAppService(db).handle_incoming(payload)
+
+
+async def _handle_sipuni(db: AsyncSession, payload: dict) -> None:
+    await SipuniService(db).handle_webhook(payload)
+
+
+HANDLERS = {
+    WebhookSource.WHATSAPP: _handle_whatsapp,
+    WebhookSource.SIPUNI: _handle_sipuni,
+}
+
+
+async def drain_batch(batch_size: int, max_attempts: int) -> int:
+    """Claim and process one batch of pending payloads; returns how many were claimed."""
+    async with async_session() as db:
+        repo = WebhookInboxRepository(db)
+        items = await repo.claim_batch(batch_size, max_attempts)
+        for item in items:
+            source, received_at = item.source, item.received_at
+            marker = pending_marker(db)
+            try:
+                # A savepoint per payload: one bad payload is retried later without failing the batch
+                async with db.begin_nested():
+                    await HANDLERS[source](db, item.payload)
+            except Exception as e:
+                discard_pending(db, marker)
+                item.attempts += 1
+                item.error = str(e)[:1000]
+                outcome = "retry" if item.attempts < max_attempts else "dead"
+                logger.error(f"Webhook inbox item {item.id} ({source.value}) failed, attempt {item.attempts}: {e}")
+            else:
+                item.processed_at = datetime.now(timezone.utc)
+                outcome = "ok"
+                inbox_lag.set((item.processed_at - received_at).total_seconds(), source=source.value)
+            inbox_processed.inc(source=source.value, outcome=outcome)
+        await db.commit()
+        return len(items)
+
+
+@registry.collector
+async def collect_inbox_stats() -> None:
+    async with async_session() as db:
+        stats = {row["source"]: row for row in await WebhookInboxRepository(db).get_stats(settings.WEBHOOK_MAX_ATTEMPTS)}
+    now = datetime.now(timezone.utc)
+    for source in WebhookSource:
+        row = stats.get(source, {})
+        oldest = row.get("oldest")
+        inbox_depth.set(row.get("depth", 0), source=source.value)
+        inbox_oldest.set((now - oldest).total_seconds() if oldest else 0, source=source.value)
+        inbox_dead.set(row.get("dead", 0), source=source.value)
+
+
+class WebhookInboxWorker:
+    """Pool of drain loops for the webhook inbox.
+
+    It runs inside the API process so the WS events raised by the handlers reach
+    the clients connected to it; SKIP LOCKED keeps several processes safe.
+    """
+
+    def __init__(self, concurrency: int, batch_size: int, poll_interval: float, max_attempts: int, retention_hours: int):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retention = timedelta(hours=retention_hours)
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+        logger.info(f"Webhook inbox worker started with {self.concurrency} loops")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self.notify()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle loops right away instead of at the next poll."""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _run(self, loop_id: int) -> None:
+        while not self._stopping:
+            try:
+                claimed = await drain_batch(self.batch_size, self.max_attempts)
+            except Exception as e:
+                logger.error(f"Webhook inbox drain failed: {e}")
+                claimed = 0
+            if loop_id == 0 and time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                await self._purge()
+            if claimed < self.batch_size:
+                await self._idle()
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _purge(self) -> None:
+        self._last_purge = time.monotonic()
+        try:
+            async with async_session() as db:
+                purged = await WebhookInboxRepository(db).purge_processed(datetime.now(timezone.utc) - self.retention)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Webhook inbox purge failed: {e}")
+            return
+        if purged:
+            logger.info(f"Purged {purged} processed webhook inbox items")
+
+
+webhook_worker = WebhookInboxWorker(
+    concurrency=settings.WEBHOOK_WORKERS,
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    poll_interval=settings.WEBHOOK_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    retention_hours=settings.WEBHOOK_RETENTION_HOURS,
+)
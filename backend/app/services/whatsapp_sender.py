@@ -0,0 +1,189 @@
+import asyncio
+import itertools
+import logging
+import random
+from dataclasses import dataclass
+import httpx
+from app.core.config import get_settings
+from app.core.metrics import registry
+from app.core.rate_limit import TokenBucket
+
+logger = logging.getLogger("atlas_crm.whatsapp_sender")
+settings = get_settings()
+
+INTERACTIVE = 0
+BULK = 1
+
+# Graph API throughput errors that can arrive without a 429 status
+RATE_LIMIT_ERROR_CODES = {4, 80007, 130429, 131056}
+
+# Transport errors raised before the request left this process, so retrying cannot duplicate a send
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+send_outcomes = registry.counter("whatsapp_send_total", "Outbound WhatsApp API calls, by outcome")
+send_queue_depth = registry.gauge("whatsapp_send_queue_depth", "Outbound WhatsApp sends waiting in this process")
+
+
+@dataclass
+class SendJob:
+    http: httpx.AsyncClient
+    payload: dict
+    future: asyncio.Future
+    attempt: int = 0
+    priority: int = INTERACTIVE
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    try:
+        return max(0.0, float(resp.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _is_rate_limited(resp: httpx.Response) -> bool:
+    if resp.status_code == 429:
+        return True
+    if resp.status_code != 400:
+        return False
+    try:
+        return resp.json().get("error", {}).get("code") in RATE_LIMIT_ERROR_CODES
+    except ValueError:
+        return False
+
+
+class WhatsAppSender:
+    """Paced send queue for the Graph API messages endpoint.
+
+    Every send waits for a token from the shared per-phone-number bucket, so a
+    burst queues up instead of being rejected. Rate-limit answers pause the bucket
+    for everyone (honouring Retry-After) and the send is requeued; 5xx answers and
+    connection failures are retried with jittered exponential backoff, while errors
+    after the request went out fail the send. Interactive sends overtake queued
+    broadcast sends.
+    """
+
+    def __init__(self, bucket: TokenBucket, concurrency: int, max_attempts: int, backoff_base: float, backoff_max: float):
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue: asyncio.PriorityQueue | None = None
+        self._workers: list[asyncio.Task] = []
+        # Backed-off sends waiting to be requeued; close() cancels them and fails their callers
+        self._retries: dict[asyncio.TimerHandle, SendJob] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._seq = itertools.count()
+
+    @property
+    def url(self) -> str:
+        return f"{settings.WHATSAPP_API_URL}/{settings.WHATSAPP_PHONE_ID}/messages"
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [loop.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def send(self, http: httpx.AsyncClient, payload: dict, priority: int = INTERACTIVE) -> httpx.Response:
+        """Queue one send and wait for its final response (after any retries)."""
+        self._ensure_started()
+        job = SendJob(http=http, payload=payload, future=self._loop.create_future(), priority=priority)
+        self._enqueue(job)
+        return await job.future
+
+    def _enqueue(self, job: SendJob) -> None:
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+        send_queue_depth.set(self._queue.qsize())
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            send_queue_depth.set(self._queue.qsize())
+            try:
+                await self._deliver(job)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: SendJob) -> None:
+        await self.bucket.acquire()
+        job.attempt += 1
+        try:
+            resp = await job.http.post(
+                self.url,
+                json=job.payload,
+                headers={"Authorization": f"Bearer {settings.WHATSAPP_TOKEN}"},
+            )
+        except UNSENT_ERRORS as e:
+            if job.attempt >= self.max_attempts:
+                send_outcomes.inc(outcome="error")
+                job.future.set_exception(e)
+            else:
+                send_outcomes.inc(outcome="retry")
+                self._retry_later(job, self._backoff(job.attempt))
+            return
+        except httpx.TransportError as e:
+            # The request may have reached the API already; a retry could deliver the message twice
+            send_outcomes.inc(outcome="error")
+            job.future.set_exception(e)
+            return
+
+        if _is_rate_limited(resp) and job.attempt < self.max_attempts:
+            send_outcomes.inc(outcome="rate_limited")
+            delay = _retry_after(resp) or self._backoff(job.attempt)
+            logger.warning(f"WA rate limited, pausing sends for {delay:.1f}s")
+            await self.bucket.pause(delay)
+            self._enqueue(job)
+        elif resp.status_code >= 500 and job.attempt < self.max_attempts:
+            send_outcomes.inc(outcome="retry")
+            self._retry_later(job, _retry_after(resp) or self._backoff(job.attempt))
+        else:
+            send_outcomes.inc(outcome="ok" if resp.status_code == 200 else "failed")
+            job.future.set_result(resp)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _retry_later(self, job: SendJob, delay: float) -> None:
+        def retry():
+            del self._retries[handle]
+            self._enqueue(job)
+
+        handle = self._loop.call_later(delay, retry)
+        self._retries[handle] = job
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        abandoned = list(self._retries.values())
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        while self._queue and not self._queue.empty():
+            abandoned.append(self._queue.get_nowait()[2])
+        for job in abandoned:
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("WhatsApp sender closed"))
+        self._workers = []
+        self._loop = None
+
+
+whatsapp_sender = WhatsAppSender(
+    bucket=TokenBucket(
+        key=f"wa:rate:{settings.WHATSAPP_PHONE_ID or 'default'}",
+        rate=settings.WHATSAPP_RATE_PER_SECOND,
+        burst=settings.WHATSAPP_RATE_BURST,
+        redis_url=settings.REDIS_URL if settings.WHATSAPP_RATE_LIMIT_BACKEND == "redis" else None,
+    ),
+    concurrency=settings.WHATSAPP_SEND_CONCURRENCY,
+    max_attempts=settings.WHATSAPP_SEND_MAX_ATTEMPTS,
+    backoff_base=settings.WHATSAPP_SEND_BACKOFF_SECONDS,
+    backoff_max=settings.WHATSAPP_SEND_BACKOFF_MAX_SECONDS,
+)
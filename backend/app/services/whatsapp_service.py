@@ -1,23 +1,55 @@
 import httpx
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import get_settings
+from app.core.http import get_http_client
+from app.core.dedup import dedup_checks, remember_on_commit, whatsapp_message_ids
 from app.models.message import Message, SenderType, MessageType, MessageStatus
 from app.models.lead import Lead
 from app.models.activity import Activity, ActivityKind
-from app.repositories.message_repo import MessageRepository
+from app.repositories.message_repo import MessageRepository, STATUS_RANK
 from app.repositories.lead_repo import LeadRepository
 from app.repositories.activity_repo import ActivityRepository
 from app.services.distribution_service import DistributionService
+from app.services.whatsapp_sender import whatsapp_sender, INTERACTIVE, BULK
 
 logger = logging.getLogger("atlas_crm.whatsapp")
 settings = get_settings()
 
+WA_STATUSES = {
+    "sent": MessageStatus.SENT,
+    "delivered": MessageStatus.DELIVERED,
+    "read": MessageStatus.READ,
+    "failed": MessageStatus.FAILED,
+}
+
+
+def collapse_statuses(statuses: list[dict]) -> dict[str, MessageStatus]:
+    """Keep the most advanced known status per wa_message_id."""
+    latest: dict[str, MessageStatus] = {}
+    for status_data in statuses:
+        wa_id = status_data.get("id", "")
+        new_status = WA_STATUSES.get(status_data.get("status", ""))
+        if not wa_id or not new_status:
+            continue
+        if wa_id not in latest or STATUS_RANK[new_status] > STATUS_RANK[latest[wa_id]]:
+            latest[wa_id] = new_status
+    return latest
+
+
+@dataclass
+class Delivery:
+    wa_message_id: str | None
+    status: MessageStatus
+    error: str | None = None
+
 
 class WhatsAppService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, http: httpx.AsyncClient | None = None):
         self.db = db
+        self.http = http or get_http_client()
         self.message_repo = MessageRepository(db)
         self.lead_repo = LeadRepository(db)
         self.activity_repo = ActivityRepository(db)
@@ -28,23 +60,28 @@ class WhatsAppService:
         return None
 
     async def handle_incoming(self, payload: dict) -> None:
+        statuses: list[dict] = []
         entries = payload.get("entry", [])
         for entry in entries:
             changes = entry.get("changes", [])
             for change in changes:
                 value = change.get("value", {})
                 messages = value.get("messages", [])
-                statuses = value.get("statuses", [])
+                statuses.extend(value.get("statuses", []))
 
                 for msg_data in messages:
                     await self._process_incoming_message(msg_data, value)
 
-                for status_data in statuses:
-                    await self._process_status(status_data)
+        # Status callbacks outnumber messages; the whole payload is applied in one statement
+        await self.message_repo.apply_statuses(collapse_statuses(statuses))
 
     async def _process_incoming_message(self, msg_data: dict, value: dict) -> None:
         phone = msg_data.get("from", "")
-        wa_id = msg_data.get("id", "")
+        wa_id = msg_data.get("id") or None
+        # Meta retries deliveries it thinks failed; a recent id is dropped without touching the database
+        if wa_id and wa_id in whatsapp_message_ids:
+            dedup_checks.inc(source="whatsapp", result="memory_hit")
+            return
         msg_type = msg_data.get("type", "text")
         content = ""
         media_url = None
@@ -95,7 +132,14 @@ class WhatsAppService:
             status=MessageStatus.DELIVERED,
             wa_message_id=wa_id,
         )
-        message = await self.message_repo.create(message)
+        message = await self.message_repo.create_if_new(message)
+        if not message:
+            dedup_checks.inc(source="whatsapp", result="db_hit")
+            whatsapp_message_ids.add(wa_id)
+            return
+        dedup_checks.inc(source="whatsapp", result="new")
+        if wa_id:
+            remember_on_commit(self.db, whatsapp_message_ids, wa_id)
 
         lead.last_activity_at = datetime.now(timezone.utc)
         await self.lead_repo.update(lead)
@@ -119,53 +163,53 @@ class WhatsAppService:
             },
         })
 
-    async def _process_status(self, status_data: dict) -> None:
-        wa_id = status_data.get("id", "")
-        status_str = status_data.get("status", "")
-        status_map = {
-            "sent": MessageStatus.SENT,
-            "delivered": MessageStatus.DELIVERED,
-            "read": MessageStatus.READ,
-            "failed": MessageStatus.FAILED,
+    async def _post_message(self, payload: dict, bulk: bool = False) -> httpx.Response:
+        # Paced by the shared per-number rate limit; over the limit the send waits in the queue
+        return await whatsapp_sender.send(self.http, payload, priority=BULK if bulk else INTERACTIVE)
+
+    @staticmethod
+    def text_payload(phone: str, content: str) -> dict:
+        return {
+            "messaging_product": "whatsapp",
+            "to": phone,
+            "type": "text",
+            "text": {"body": content},
+        }
+
+    @staticmethod
+    def template_payload(phone: str, template_name: str, language: str | None) -> dict:
+        return {
+            "messaging_product": "whatsapp",
+            "to": phone,
+            "type": "template",
+            "template": {
+                "name": template_name,
+                "language": {"code": language or "ru"},
+            },
         }
-        new_status = status_map.get(status_str)
-        if new_status and wa_id:
-            await self.message_repo.update_status(wa_id, new_status)
-
-    async def send_text(self, lead: Lead, content: str) -> Message:
-        wa_message_id = None
-
-        if not settings.MOCK_INTEGRATIONS:
-            url = f"{settings.WHATSAPP_API_URL}/{settings.WHATSAPP_PHONE_ID}/messages"
-            payload = {
-                "messaging_product": "whatsapp",
-                "to": lead.phone,
-                "type": "text",
-                "text": {"body": content},
-            }
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    url,
-                    json=payload,
-                    headers={"Authorization": f"Bearer {settings.WHATSAPP_TOKEN}"},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    wa_message_id = data.get("messages", [{}])[0].get("id")
-                else:
-                    logger.error(f"WA send failed: {resp.status_code} {resp.text}")
-        else:
+
+    async def deliver(self, payload: dict, bulk: bool = False) -> Delivery:
+        """Send one payload to the Graph API without touching the database."""
+        if settings.MOCK_INTEGRATIONS:
             import uuid
-            wa_message_id = f"mock_{uuid.uuid4().hex[:12]}"
-            logger.info(f"[MOCK] WA message to {lead.phone}: {content}")
+            logger.info(f"[MOCK] WA {payload['type']} to {payload['to']}")
+            return Delivery(f"mock_{uuid.uuid4().hex[:12]}", MessageStatus.SENT)
+        resp = await self._post_message(payload, bulk)
+        if resp.status_code == 200:
+            return Delivery(resp.json().get("messages", [{}])[0].get("id"), MessageStatus.SENT)
+        logger.error(f"WA {payload['type']} send failed: {resp.status_code} {resp.text}")
+        return Delivery(None, MessageStatus.FAILED, f"{resp.status_code} {resp.text[:500]}")
+
+    async def send_text(self, lead: Lead, content: str, bulk: bool = False) -> Message:
+        delivery = await self.deliver(self.text_payload(lead.phone, content), bulk)
 
         message = Message(
             lead_id=lead.id,
             sender_type=SenderType.MANAGER,
             type=MessageType.TEXT,
             content=content,
-            status=MessageStatus.SENT,
-            wa_message_id=wa_message_id,
+            status=delivery.status,
+            wa_message_id=delivery.wa_message_id,
         )
         message = await self.message_repo.create(message)
 
@@ -181,41 +225,16 @@ class WhatsAppService:
 
         return message
 
-    async def send_template(self, lead: Lead, template_name: str, body: str = "") -> Message:
-        wa_message_id = None
-
-        if not settings.MOCK_INTEGRATIONS:
-            url = f"{settings.WHATSAPP_API_URL}/{settings.WHATSAPP_PHONE_ID}/messages"
-            payload = {
-                "messaging_product": "whatsapp",
-                "to": lead.phone,
-                "type": "template",
-                "template": {
-                    "name": template_name,
-                    "language": {"code": lead.language or "ru"},
-                },
-            }
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    url,
-                    json=payload,
-                    headers={"Authorization": f"Bearer {settings.WHATSAPP_TOKEN}"},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    wa_message_id = data.get("messages", [{}])[0].get("id")
-        else:
-            import uuid
-            wa_message_id = f"mock_{uuid.uuid4().hex[:12]}"
-            logger.info(f"[MOCK] WA template '{template_name}' to {lead.phone}")
+    async def send_template(self, lead: Lead, template_name: str, body: str = "", bulk: bool = False) -> Message:
+        delivery = await self.deliver(self.template_payload(lead.phone, template_name, lead.language), bulk)
 
         message = Message(
             lead_id=lead.id,
             sender_type=SenderType.MANAGER,
             type=MessageType.TEMPLATE,
             content=body or f"[Template: {template_name}]",
-            status=MessageStatus.SENT,
-            wa_message_id=wa_message_id,
+            status=delivery.status,
+            wa_message_id=delivery.wa_message_id,
         )
         message = await self.message_repo.create(message)
         return message
@@ -0,0 +1,30 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Decode an opaque cursor back into values of the given types (datetimes are parsed from ISO)."""
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursorError("Malformed cursor")
+    try:
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except (TypeError, ValueError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
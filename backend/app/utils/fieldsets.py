@@ -0,0 +1,43 @@
+import json
+from datetime import datetime
+from fastapi import HTTPException, Response
+
+
+def parse_fieldset(raw: str | None, allowed, param: str) -> list[str] | None:
+    if raw is None:
+        return None
+    names = list(dict.fromkeys(n.strip() for n in raw.split(",") if n.strip()))
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {param}: {', '.join(unknown)}")
+    return names
+
+
+def nest_row(row: dict) -> dict:
+    """Fold "relation__column" keys into nested objects; a relation with no matching row becomes None."""
+    out: dict = {}
+    nested: dict[str, dict] = {}
+    for key, value in row.items():
+        if "__" in key:
+            relation, column = key.split("__", 1)
+            nested.setdefault(relation, {})[column] = value
+        else:
+            out[key] = value
+    for relation, values in nested.items():
+        out[relation] = values if any(v is not None for v in values.values()) else None
+    return out
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def json_rows_response(rows: list[dict], headers: dict | None = None) -> Response:
+    # Rows are already plain dicts, so skip response_model validation entirely
+    return Response(
+        content=json.dumps(rows, default=_json_default, ensure_ascii=False),
+        media_type="application/json",
+        headers=headers,
+    )
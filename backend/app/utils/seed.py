@@ -5,6 +5,7 @@ from app.db.session import async_session, engine
 from app.db.base import Base
 from app.models import *
 from app.core.security import hash_password
+from app.repositories.message_repo import MessageRepository
 
 logger = logging.getLogger("atlas_crm.seed")
 
@@ -78,10 +79,10 @@ async def seed():
             (leads[4].id, SenderType.CLIENT, "Добрый день! Готовы оформиться на Умру, отправляйте договор"),
             (leads[4].id, SenderType.MANAGER, "Здравствуйте! Отлично, подготовлю договор сегодня и отправлю вам"),
         ]
+        message_repo = MessageRepository(db)
         for lead_id, sender, content in messages_data:
             msg = Message(lead_id=lead_id, sender_type=sender, type=MessageType.TEXT, content=content, status=MessageStatus.DELIVERED)
-            db.add(msg)
-        await db.flush()
+            await message_repo.create(msg)
 
         calls_data = [
             (leads[1].id, mgr1.id, CallDirection.OUT, 180, "answered"),
@@ -1,29 +1,105 @@
 import asyncio
 import logging
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.workers.celery_app import celery_app
 
 logger = logging.getLogger("atlas_crm.tasks")
 
+# One loop per worker process: the pooled HTTP client and DB connections are bound to it
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
 
 def run_async(coro):
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+    return _get_loop().run_until_complete(coro)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    from app.core.http import get_http_client
+    from app.db.session import engine
+
+    # Connections inherited from the parent process must not be shared with it
+    engine.sync_engine.dispose(close=False)
+    _get_loop()
+    get_http_client()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    from app.core.event_relay import event_relay
+    from app.core.http import close_http_client
+    from app.db.session import engine
+    from app.services.whatsapp_sender import whatsapp_sender
+
+    if _loop is None or _loop.is_closed():
+        return
+    _loop.run_until_complete(whatsapp_sender.close())
+    _loop.run_until_complete(event_relay.close())
+    _loop.run_until_complete(close_http_client())
+    _loop.run_until_complete(engine.dispose())
+    _loop.close()
 
 
-@celery_app.task(name="execute_broadcast")
-def execute_broadcast_task(broadcast_id: int):
+async def _with_service(fn):
     from app.db.session import async_session
     from app.services.broadcast_service import BroadcastService
 
-    async def _run():
-        async with async_session() as db:
-            service = BroadcastService(db)
-            await service.execute_broadcast(broadcast_id)
-            await db.commit()
+    async with async_session() as db:
+        return await fn(BroadcastService(db))
+
+
+@celery_app.task(name="execute_broadcast", acks_late=True, reject_on_worker_lost=True)
+def execute_broadcast_task(broadcast_id: int, scheduled_for: str | None = None):
+    from datetime import datetime, timezone
+    from celery import chain, chord
+    from app.core.config import get_settings
+
+    when = None
+    if scheduled_for:
+        # Naive times were stored as UTC by the timestamptz column
+        when = datetime.fromisoformat(scheduled_for)
+        when = when if when.tzinfo else when.replace(tzinfo=timezone.utc)
+    shard_ids = run_async(_with_service(lambda service: service.prepare(broadcast_id, when)))
+    if shard_ids is None:
+        return
+    logger.info(f"Executing broadcast {broadcast_id} in {len(shard_ids)} shards")
+    finalizer = finalize_broadcast_task.si(broadcast_id)
+    if not shard_ids:
+        finalizer.delay()
+        return
+    shards = [send_broadcast_shard_task.si(broadcast_id, shard_id) for shard_id in shard_ids]
+    # A failed shard skips the chord callback (and the rest of a chain); the errback still settles the broadcast
+    on_failure = settle_failed_broadcast_task.si(broadcast_id)
+    # Shards only run side by side when the WhatsApp rate limit is shared through Redis;
+    # with per-process buckets every parallel shard would add its own full rate
+    if get_settings().WHATSAPP_RATE_LIMIT_BACKEND == "redis":
+        chord(shards)(finalizer.on_error(on_failure))
+    else:
+        chain(*shards, finalizer).on_error(on_failure).delay()
+
+
+# Redelivered if the worker dies mid-shard; the rerun resumes from the shard's checkpoint
+@celery_app.task(name="send_broadcast_shard", acks_late=True, reject_on_worker_lost=True)
+def send_broadcast_shard_task(broadcast_id: int, shard_id: int):
+    logger.info(f"Broadcast {broadcast_id}: sending shard {shard_id}")
+    run_async(_with_service(lambda service: service.run_shard(shard_id)))
+
+
+@celery_app.task(name="finalize_broadcast", acks_late=True)
+def finalize_broadcast_task(broadcast_id: int):
+    run_async(_with_service(lambda service: service.finalize(broadcast_id)))
+    logger.info(f"Broadcast {broadcast_id} finalized")
+
 
-    logger.info(f"Executing broadcast {broadcast_id}")
-    run_async(_run())
-    logger.info(f"Broadcast {broadcast_id} completed")
+# Error callback of the shard chord/chain; Celery queues it as a task since it takes one argument
+@celery_app.task(name="settle_failed_broadcast", acks_late=True)
+def settle_failed_broadcast_task(broadcast_id: int):
+    run_async(_with_service(lambda service: service.finalize(broadcast_id, failed=True)))
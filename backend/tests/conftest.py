@@ -0,0 +1,45 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.db.base import Base
+
+# Repository tests run on a throwaway SQLite file unless a Postgres test database is given
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+requires_postgres = pytest.mark.skipif(
+    not (TEST_DATABASE_URL or "").startswith("postgresql"),
+    reason="needs TEST_DATABASE_URL pointing at Postgres",
+)
+
+
+def _enforce_foreign_keys(dbapi_connection, _):
+    # SQLite leaves foreign keys unchecked unless asked, Postgres always checks them
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """Run `scenario(session_factory)` against a freshly created schema and return its result."""
+    url = TEST_DATABASE_URL or f"sqlite+aiosqlite:///{tmp_path / 'test.sqlite'}"
+
+    def run(scenario):
+        async def main():
+            engine = create_async_engine(url)
+            if engine.dialect.name == "sqlite":
+                event.listen(engine.sync_engine, "connect", _enforce_foreign_keys)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.run_sync(Base.metadata.create_all)
+            try:
+                return await scenario(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from app.api.v1.ws import ConnectionManager
+from app.core.event_relay import EventRelay
+from app.models.user import UserRole
+from app.services.broadcast_service import ProgressCoalescer, ProgressThrottle
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+
+def test_throttle_passes_each_percent_step_once():
+    throttle = ProgressThrottle(total=1000, interval=3600, step=10)
+    passed = [done for done in range(0, 1001, 25) if throttle.ready(done)]
+    assert passed == [100, 200, 300, 400, 500, 600, 700, 800, 900, 1000]
+
+
+def test_throttle_falls_back_to_interval_without_total():
+    throttle = ProgressThrottle(total=None, interval=0, step=10)
+    assert throttle.ready(1) and throttle.ready(2)
+    assert not ProgressThrottle(total=None, interval=3600, step=10).ready(1)
+
+
+def test_coalescer_throttles_each_broadcast_across_shards():
+    coalescer = ProgressCoalescer(interval=3600, step=50)
+
+    def progress(broadcast_id, done):
+        return {"event": "broadcast:progress", "data": {"broadcast_id": broadcast_id, "sent": done, "failed": 0, "total": 100}}
+
+    admitted = [
+        coalescer.admit(progress(broadcast_id, done))
+        for broadcast_id, done in [(1, 20), (2, 50), (1, 50), (1, 40), (1, 70), (2, 60), (1, 100)]
+    ]
+    assert admitted == [False, True, True, False, False, False, True]
+    assert coalescer.admit({"event": "broadcast:finished", "data": {"broadcast_id": 1}})
+    assert coalescer.admit({"event": "lead:new", "data": {}})
+
+
+def test_send_to_roles_skips_managers():
+    manager = ConnectionManager()
+    sockets = {role: RecordingSocket() for role in UserRole}
+
+    async def main():
+        for uid, (role, ws) in enumerate(sockets.items(), start=1):
+            await manager.connect(SimpleNamespace(id=uid, name=role.value, role=role), ws)
+        await manager.send_to_roles((UserRole.ADMIN, UserRole.HEAD), {"event": "broadcast:progress"})
+
+    asyncio.run(main())
+    assert sockets[UserRole.ADMIN].sent == [{"event": "broadcast:progress"}]
+    assert sockets[UserRole.HEAD].sent == [{"event": "broadcast:progress"}]
+    assert sockets[UserRole.MANAGER].sent == []
+
+
+class LoopbackRedis:
+    """Just enough of redis.asyncio for a single pub/sub channel."""
+
+    def __init__(self):
+        self.messages = asyncio.Queue()
+
+    async def publish(self, channel, message):
+        await self.messages.put({"type": "message", "channel": channel, "data": message})
+
+    def pubsub(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def subscribe(self, channel):
+        await self.messages.put({"type": "subscribe", "channel": channel, "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def aclose(self):
+        pass
+
+
+def test_relay_delivers_published_events_with_roles():
+    relay = EventRelay("redis://unused")
+    relay._redis = LoopbackRedis()
+    delivered = []
+
+    async def deliver(roles, event):
+        delivered.append((roles, event))
+
+    async def main():
+        relay.start(deliver)
+        await relay.publish((UserRole.ADMIN, UserRole.HEAD), {"event": "broadcast:finished", "data": {"broadcast_id": 1}})
+        await asyncio.sleep(0.05)
+        await relay.close()
+
+    asyncio.run(main())
+    assert delivered == [((UserRole.ADMIN, UserRole.HEAD), {"event": "broadcast:finished", "data": {"broadcast_id": 1}})]
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from app.models.broadcast import Broadcast, BroadcastLog, BroadcastShard, BroadcastStatus
+from app.models.lead import Lead
+from app.models.message import MessageStatus
+from app.models.user import User, UserRole
+from app.repositories.broadcast_repo import BroadcastRepository, LOG_FAILED, LOG_PENDING, LOG_SENT
+from app.services.broadcast_service import BroadcastService
+from app.services.whatsapp_service import Delivery
+
+STALE = datetime.now(timezone.utc) - timedelta(hours=1)
+
+
+async def setup_broadcast(db, leads: int = 10) -> tuple[int, list[int]]:
+    user = User(email="admin@example.com", name="Admin", role=UserRole.ADMIN, password_hash="x")
+    rows = [Lead(name=f"L{n}", phone=f"+7700000{n:04d}") for n in range(leads)]
+    db.add_all([user, *rows])
+    await db.flush()
+    broadcast = Broadcast(name="b", body="hi", status=BroadcastStatus.SENDING, created_by=user.id)
+    db.add(broadcast)
+    await db.commit()
+    return broadcast.id, [lead.id for lead in rows]
+
+
+def recording_sender(service: BroadcastService) -> list[int]:
+    sent = []
+
+    async def send(broadcast, lead):
+        sent.append(lead.id)
+        return lead, Delivery(f"wamid.{lead.id}", MessageStatus.SENT), None
+
+    service._send = send
+    return sent
+
+
+async def interrupt(db, broadcast_id: int, shard_id: int, sent: list[int], pending: list[int], heartbeat_at) -> None:
+    """Leave the shard as a run that died after claiming `pending` would."""
+    db.add_all(
+        [BroadcastLog(broadcast_id=broadcast_id, lead_id=lead_id, status=LOG_SENT) for lead_id in sent]
+        + [BroadcastLog(broadcast_id=broadcast_id, lead_id=lead_id, status=LOG_PENDING) for lead_id in pending]
+    )
+    shard = await db.get(BroadcastShard, shard_id)
+    shard.last_lead_id = pending[-1]
+    shard.heartbeat_at = heartbeat_at
+    await db.commit()
+
+
+async def log_statuses(db, broadcast_id: int) -> dict[int, str]:
+    result = await db.execute(
+        select(BroadcastLog.lead_id, BroadcastLog.status).where(BroadcastLog.broadcast_id == broadcast_id)
+    )
+    return dict(result.all())
+
+
+def test_redelivered_shard_resumes_from_its_checkpoint(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            broadcast_id, leads = await setup_broadcast(db)
+            service = BroadcastService(db)
+            [shard_id] = await service.prepare(broadcast_id)
+            await interrupt(db, broadcast_id, shard_id, sent=leads[:2], pending=leads[2:4], heartbeat_at=STALE)
+            sent = recording_sender(service)
+            await service.run_shard(shard_id)
+            shard = await db.get(BroadcastShard, shard_id)
+            await db.refresh(shard)
+            return leads, sent, await log_statuses(db, broadcast_id), shard.finished_at is not None
+
+    leads, sent, statuses, finished = run_db(scenario)
+    assert sent == leads[4:]
+    assert [statuses[lead_id] for lead_id in leads] == [LOG_SENT] * 2 + [LOG_FAILED] * 2 + [LOG_SENT] * 6
+    assert finished
+
+
+def test_second_lease_on_a_live_shard_is_refused(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            broadcast_id, leads = await setup_broadcast(db)
+            service = BroadcastService(db)
+            [shard_id] = await service.prepare(broadcast_id)
+            await interrupt(db, broadcast_id, shard_id, sent=[], pending=leads[:2], heartbeat_at=datetime.now(timezone.utc))
+            leased = await BroadcastRepository(db).lease_shard(shard_id, STALE)
+            await db.rollback()
+            sent = recording_sender(service)
+            await service.run_shard(shard_id)
+            return leased, sent, await log_statuses(db, broadcast_id)
+
+    leased, sent, statuses = run_db(scenario)
+    assert not leased
+    assert sent == []
+    assert set(statuses.values()) == {LOG_PENDING}
+
+
+def test_failed_shard_pauses_and_recounts_from_logs(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            broadcast_id, leads = await setup_broadcast(db)
+            service = BroadcastService(db)
+            [shard_id] = await service.prepare(broadcast_id)
+            await interrupt(db, broadcast_id, shard_id, sent=leads[:3], pending=leads[3:4], heartbeat_at=None)
+            broadcast = await db.get(Broadcast, broadcast_id)
+            broadcast.sent_count, broadcast.failed_count = 7, 7
+            await db.commit()
+            await service.finalize(broadcast_id, failed=True)
+            return broadcast.status, broadcast.sent_count, broadcast.failed_count
+
+    assert run_db(scenario) == (BroadcastStatus.PAUSED, 3, 0)
+
+
+def test_failed_shard_does_not_pause_while_another_shard_is_live(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            broadcast_id, leads = await setup_broadcast(db)
+            service = BroadcastService(db)
+            [shard_id] = await service.prepare(broadcast_id)
+            await interrupt(db, broadcast_id, shard_id, sent=leads[:3], pending=leads[3:4], heartbeat_at=datetime.now(timezone.utc))
+            await service.finalize(broadcast_id, failed=True)
+            return (await db.get(Broadcast, broadcast_id)).status
+
+    assert run_db(scenario) == BroadcastStatus.SENDING
+
+
+def test_shard_that_raises_releases_its_lease(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            broadcast_id, _ = await setup_broadcast(db)
+            service = BroadcastService(db)
+            [shard_id] = await service.prepare(broadcast_id)
+
+            async def send(broadcast, lead):
+                raise RuntimeError("boom")
+
+            service._send = send
+            try:
+                await service.run_shard(shard_id)
+            except RuntimeError:
+                pass
+            shard = await db.get(BroadcastShard, shard_id)
+            await db.refresh(shard)
+            return shard.heartbeat_at, await BroadcastRepository(db).lease_shard(shard_id, datetime.now(timezone.utc))
+
+    assert run_db(scenario) == (None, True)
@@ -0,0 +1,70 @@
+import itertools
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from app.api.v1.routes.broadcasts import pause_broadcast, resume_broadcast, schedule_broadcast
+from app.models.broadcast import Broadcast, BroadcastStatus
+from app.models.user import User, UserRole
+from app.repositories.broadcast_repo import BroadcastRepository
+from app.schemas.broadcast import BroadcastSchedule
+from app.services.broadcast_service import BroadcastService
+
+user_numbers = itertools.count()
+
+
+async def add_broadcast(db, status: BroadcastStatus, **values) -> int:
+    user = User(email=f"admin{next(user_numbers)}@example.com", name="Admin", role=UserRole.ADMIN, password_hash="x")
+    db.add(user)
+    await db.flush()
+    broadcast = Broadcast(name="b", body="hi", status=status, created_by=user.id, **values)
+    db.add(broadcast)
+    await db.commit()
+    return broadcast.id
+
+
+async def conflict(call) -> int:
+    with pytest.raises(HTTPException) as exc:
+        await call
+    return exc.value.status_code
+
+
+def test_invalid_moves_answer_409(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            draft = await add_broadcast(db, BroadcastStatus.DRAFT)
+            cancelled = await add_broadcast(db, BroadcastStatus.CANCELLED)
+            done = await add_broadcast(db, BroadcastStatus.DONE)
+            return [
+                await conflict(pause_broadcast(draft, db=db, current_user=None)),
+                await conflict(schedule_broadcast(cancelled, BroadcastSchedule(), db=db, current_user=None)),
+                await conflict(schedule_broadcast(done, BroadcastSchedule(), db=db, current_user=None)),
+                await conflict(resume_broadcast(done, db=db, current_user=None)),
+                (await db.get(Broadcast, cancelled)).status,
+            ]
+
+    assert run_db(scenario) == [409, 409, 409, 409, BroadcastStatus.CANCELLED]
+
+
+def test_resume_is_refused_while_the_run_heartbeats(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            now = datetime.now(timezone.utc)
+            live = await add_broadcast(db, BroadcastStatus.SENDING, heartbeat_at=now)
+            dead = await add_broadcast(db, BroadcastStatus.SENDING, heartbeat_at=now - timedelta(hours=1))
+            status_code = await conflict(resume_broadcast(live, db=db, current_user=None))
+            repo = BroadcastRepository(db)
+            stale_before = now - timedelta(minutes=5)
+            return status_code, await repo.resume(live, stale_before), await repo.resume(dead, stale_before)
+
+    assert run_db(scenario) == (409, False, True)
+
+
+def test_superseded_scheduled_run_does_nothing(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+            # Paused while scheduled, then resumed: the original ETA task must not start a second run
+            resumed = await add_broadcast(db, BroadcastStatus.SENDING, scheduled_at=at)
+            return await BroadcastService(db).prepare(resumed, scheduled_for=at)
+
+    assert run_db(scenario) is None
@@ -0,0 +1,29 @@
+import asyncio
+from sqlalchemy.dialects import postgresql
+from app.db.bulk import insert_rows, MAX_ROWS_PER_INSERT
+from app.models.broadcast import BroadcastLog
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+def test_insert_rows_uses_multi_row_statements():
+    db = RecordingSession()
+    rows = [{"broadcast_id": 1, "lead_id": i, "status": "sent"} for i in range(MAX_ROWS_PER_INSERT + 5)]
+    asyncio.run(insert_rows(db, BroadcastLog, rows))
+
+    assert len(db.statements) == 2
+    sql = str(db.statements[1].compile(dialect=postgresql.dialect()))
+    assert sql.count("VALUES") == 1
+    assert sql.count("), (") == 4
+
+
+def test_insert_rows_skips_empty_batches():
+    db = RecordingSession()
+    asyncio.run(insert_rows(db, BroadcastLog, []))
+    assert db.statements == []
@@ -0,0 +1,18 @@
+import pytest
+from datetime import datetime, timezone
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
+
+
+def test_cursor_roundtrip():
+    ts = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor(ts, 42)
+    assert decode_cursor(cursor, datetime, int) == (ts, 42)
+
+
+def test_invalid_cursor():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("garbage", datetime, int)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor(1), datetime, int)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor("not-a-date", 1), datetime, int)
@@ -0,0 +1,56 @@
+from sqlalchemy import func, select
+from app.core.dedup import RecentKeys, dedup_checks, whatsapp_message_ids
+from app.models.lead import Lead
+from app.models.message import Message, SenderType
+from app.repositories.message_repo import MessageRepository
+from app.services.whatsapp_service import WhatsAppService
+
+
+def test_recent_keys_is_bounded_lru():
+    keys = RecentKeys(max_size=2)
+    keys.add("a")
+    keys.add("b")
+    assert "a" in keys
+    keys.add("c")
+    assert "a" in keys
+    assert "b" not in keys
+
+
+def test_create_if_new_skips_a_stored_wa_message_id(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            lead = Lead(name="L", phone="+77000000001")
+            db.add(lead)
+            await db.flush()
+            repo = MessageRepository(db)
+
+            def delivery():
+                return Message(lead_id=lead.id, sender_type=SenderType.CLIENT, content="hi", wa_message_id="wamid.repeat")
+
+            stored, duplicate = await repo.create_if_new(delivery()), await repo.create_if_new(delivery())
+            return stored is not None, duplicate, await db.scalar(select(func.count(Message.id)))
+
+    assert run_db(scenario) == (True, None, 1)
+
+
+def test_redelivered_message_is_counted_as_memory_then_db_hit(run_db):
+    def hits():
+        return {result: dedup_checks.get(source="whatsapp", result=result) for result in ("new", "memory_hit", "db_hit")}
+
+    delivery = {"from": "+77000000042", "id": "wamid.redelivered", "type": "text", "text": {"body": "hi"}}
+
+    async def scenario(sessions):
+        async with sessions() as db:
+            service = WhatsAppService(db, http=object())
+            before = hits()
+            await service._process_incoming_message(delivery, {})
+            await db.commit()
+            await service._process_incoming_message(delivery, {})
+            # Another process, or this one after the LRU evicted the id, only has the database to go on
+            whatsapp_message_ids.clear()
+            await service._process_incoming_message(delivery, {})
+            after = hits()
+            stored = await db.scalar(select(func.count(Message.id)))
+            return {result: after[result] - before[result] for result in after}, stored
+
+    assert run_db(scenario) == ({"new": 1, "memory_hit": 1, "db_hit": 1}, 1)
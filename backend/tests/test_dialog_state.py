@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from app.models.lead import Lead
+from app.models.message import Message, LeadDialogState, SenderType, MessageType
+from app.repositories.message_repo import MessageRepository
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def message(lead_id: int, sender: SenderType, minutes: int, content: str, type_=MessageType.TEXT) -> Message:
+    return Message(
+        lead_id=lead_id, sender_type=sender, type=type_, content=content,
+        created_at=T0 + timedelta(minutes=minutes),
+    )
+
+
+async def add_lead(db) -> int:
+    lead = Lead(name="L", phone="+77000000001")
+    db.add(lead)
+    await db.flush()
+    return lead.id
+
+
+def test_unread_counts_client_messages_since_last_reply(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            lead_id = await add_lead(db)
+            repo = MessageRepository(db)
+            await repo.create_if_new(message(lead_id, SenderType.CLIENT, 1, "hi"))
+            await repo.create_if_new(message(lead_id, SenderType.CLIENT, 2, "hello?"))
+            await repo.create_if_new(message(lead_id, SenderType.MANAGER, 3, "template", MessageType.TEMPLATE))
+            unread_after_template = await db.scalar(select(LeadDialogState.unread_count))
+            await repo.create_if_new(message(lead_id, SenderType.MANAGER, 4, "reply"))
+            await repo.create_if_new(message(lead_id, SenderType.CLIENT, 5, "thanks"))
+            return unread_after_template, await db.scalar(select(LeadDialogState.unread_count))
+
+    assert run_db(scenario) == (2, 1)
+
+
+def test_late_older_message_does_not_overwrite_dialog(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            lead_id = await add_lead(db)
+            repo = MessageRepository(db)
+            await repo.create_if_new(message(lead_id, SenderType.CLIENT, 5, "newest"))
+            await repo.create_if_new(message(lead_id, SenderType.MANAGER, 1, "older reply"))
+            await repo.touch_dialogs_outbound([{
+                "id": 999, "lead_id": lead_id, "content": "older broadcast", "created_at": T0,
+            }])
+            state = await db.scalar(select(LeadDialogState))
+            return state.last_message_preview, state.unread_count
+
+    assert run_db(scenario) == ("newest", 1)
@@ -0,0 +1,60 @@
+import asyncio
+import httpx
+from app.devtools.fake_integrations import FakeIntegrationSettings, create_app
+
+SEND = {"messaging_product": "whatsapp", "to": "+77001234567", "type": "text", "text": {"body": "hi"}}
+AUTH = {"Authorization": "Bearer test"}
+
+
+def run_fake(config: FakeIntegrationSettings, scenario):
+    webhooks = []
+
+    def capture(request: httpx.Request) -> httpx.Response:
+        webhooks.append(request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    async def main():
+        app = create_app(config, transport=httpx.MockTransport(capture))
+        fake = app.state.fake
+        await fake.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake") as client:
+                return await scenario(client)
+        finally:
+            await fake.stop()
+
+    return asyncio.run(main()), webhooks
+
+
+def test_accepted_send_emits_status_webhooks():
+    config = FakeIntegrationSettings(
+        LATENCY_MEDIAN_MS=0, STATUS_DELAY_MS=10, STATUS_FLUSH_MS=10, READ_RATE=1.0, RATE_LIMIT_PER_SECOND=0,
+    )
+
+    async def scenario(client):
+        resp = await client.post("/v18.0/123/messages", json=SEND, headers=AUTH)
+        await asyncio.sleep(0.2)
+        return resp
+
+    resp, webhooks = run_fake(config, scenario)
+    assert resp.status_code == 200
+    wa_id = resp.json()["messages"][0]["id"]
+    statuses = [
+        status
+        for request in webhooks
+        for status in httpx.Response(200, content=request.content).json()["entry"][0]["changes"][0]["value"]["statuses"]
+    ]
+    assert [s["status"] for s in statuses] == ["sent", "delivered", "read"]
+    assert {s["id"] for s in statuses} == {wa_id}
+
+
+def test_throughput_cap_answers_429_with_retry_after():
+    config = FakeIntegrationSettings(LATENCY_MEDIAN_MS=0, RATE_LIMIT_PER_SECOND=2, RETRY_AFTER_SECONDS=3)
+
+    async def scenario(client):
+        return [await client.post("/v18.0/123/messages", json=SEND, headers=AUTH) for _ in range(3)]
+
+    responses, _ = run_fake(config, scenario)
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].headers["Retry-After"] == "3"
+    assert responses[2].json()["error"]["code"] == 130429
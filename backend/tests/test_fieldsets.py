@@ -0,0 +1,37 @@
+import json
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException, Response
+from app.api.v1.routes.leads import list_leads
+from app.core.principal_cache import Principal
+from app.models.lead import Lead
+from app.models.user import UserRole
+from app.utils.fieldsets import parse_fieldset, nest_row
+
+ADMIN = Principal(id=1, email="admin@example.com", name="Admin", role=UserRole.ADMIN, is_active=True, created_at=datetime.now(timezone.utc))
+
+
+def test_parse_fieldset():
+    assert parse_fieldset(None, {"id", "name"}, "fields") is None
+    assert parse_fieldset("name, id,name", {"id", "name"}, "fields") == ["name", "id"]
+    with pytest.raises(HTTPException):
+        parse_fieldset("name,secret", {"id", "name"}, "fields")
+
+
+def test_nest_row():
+    row = {"id": 1, "stage__id": 2, "stage__name": "New", "manager__id": None, "manager__name": None}
+    assert nest_row(row) == {"id": 1, "stage": {"id": 2, "name": "New"}, "manager": None}
+
+
+def test_sparse_leads_carry_only_the_requested_fields(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            db.add_all([Lead(name=f"L{n}", phone=f"+7700000000{n}") for n in range(2)])
+            await db.commit()
+            page = await list_leads(Response(), limit=1, fields="name", db=db, current_user=ADMIN)
+            return json.loads(page.body), page.headers.get("X-Next-Cursor")
+
+    rows, next_cursor = run_db(scenario)
+    assert [list(row) for row in rows] == [["name"]]
+    # The cursor still pages on the id and updated_at the rows no longer show
+    assert next_cursor
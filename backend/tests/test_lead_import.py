@@ -0,0 +1,80 @@
+import itertools
+from sqlalchemy import delete, event, func, select
+from app.models.activity import Activity
+from app.models.distribution import DistributionAlgorithm, DistributionRule
+from app.models.lead import Lead
+from app.models.pipeline import Pipeline, Stage
+from app.models.user import User, UserRole
+from app.services.distribution_service import DistributionService
+from app.services.lead_import_service import LeadImportService
+
+user_numbers = itertools.count()
+
+
+async def add_manager(db, name: str) -> int:
+    user = User(email=f"{name}{next(user_numbers)}@example.com", name=name, role=UserRole.MANAGER, password_hash="x")
+    db.add(user)
+    await db.flush()
+    return user.id
+
+
+def test_failing_chunk_rolls_back_only_its_savepoint(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            await add_manager(db, "manager")
+            pipeline = Pipeline(name="Sales")
+            db.add(pipeline)
+            await db.flush()
+            stage = Stage(pipeline_id=pipeline.id, name="New", position=0)
+            db.add(stage)
+            await db.commit()
+
+            rows = ["name,phone,stage_id", "A,+77000000001,", "B,+77000000002,", "C,+77000000003,", f"D,+77000000004,{stage.id}", "E,+77000000005,"]
+
+            async def upload():
+                for n, line in enumerate(rows):
+                    if n == 4:
+                        # The stage passed validation but is gone by the time its chunk is inserted
+                        await db.execute(delete(Stage))
+                    yield f"{line}\n".encode()
+
+            service = LeadImportService(db)
+            service.chunk_size = 2
+            summary = await service.import_stream(upload(), "csv", "admin")
+            names = (await db.execute(select(Lead.name).order_by(Lead.name))).scalars().all()
+            return summary, names, await db.scalar(select(func.count(Activity.id)))
+
+    summary, names, activities = run_db(scenario)
+    assert (summary["created"], summary["failed"]) == (3, 2)
+    assert [error["row"] for error in summary["errors"]] == [3, 4]
+    assert names == ["A", "B", "E"]
+    assert activities == 3
+
+
+def test_assign_managers_batches_lookups(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            busy, idle = await add_manager(db, "busy"), await add_manager(db, "idle")
+            db.add_all([Lead(name=f"old{n}", phone=f"+7701000000{n}", manager_id=busy) for n in range(3)])
+            db.add(DistributionRule(algorithm=DistributionAlgorithm.LOAD_BASED))
+            await db.commit()
+
+            leads = [
+                Lead(name="returning", phone="+77010000000", source="manual", language="ru"),
+                *(Lead(name=f"new{n}", phone=f"+7702000000{n}", source="manual", language="ru") for n in range(3)),
+                Lead(name="same phone", phone="+77020000000", source="manual", language="ru"),
+            ]
+            statements = []
+            engine = sessions.kw["bind"].sync_engine
+            record = lambda *args: statements.append(args[2])  # noqa: E731
+            event.listen(engine, "before_cursor_execute", record)
+            await DistributionService(db).assign_managers(leads)
+            event.remove(engine, "before_cursor_execute", record)
+            assigned = [(lead.manager_id, bool(lead.is_returning)) for lead in leads]
+            return busy, idle, assigned, len(statements)
+
+    busy, idle, assigned, statements = run_db(scenario)
+    # A phone seen earlier in the batch stays with the manager it was just given
+    assert assigned == [(busy, True), (idle, False), (idle, False), (idle, False), (idle, True)]
+    # Managers, rules, active users, previous owners of the phones and lead counts, whatever the batch size
+    assert statements == 5
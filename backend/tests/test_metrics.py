@@ -0,0 +1,20 @@
+import asyncio
+from app.core.metrics import Registry
+
+
+def test_render_counters_and_gauges():
+    registry = Registry()
+    processed = registry.counter("jobs_total", "Jobs handled")
+    depth = registry.gauge("queue_depth", "Items waiting")
+
+    @registry.collector
+    async def collect():
+        depth.set(7, source="whatsapp")
+
+    processed.inc(source="sipuni", outcome="ok")
+    processed.inc(2, source="sipuni", outcome="ok")
+    text = asyncio.run(registry.render())
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{outcome="ok",source="sipuni"} 3' in text
+    assert 'queue_depth{source="whatsapp"} 7' in text
+    assert registry.counter("jobs_total", "again") is processed
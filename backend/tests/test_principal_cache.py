@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime, timezone
+from app.core.principal_cache import Principal, PrincipalCache
+from app.models.user import UserRole
+
+
+def make_principal(user_id: int = 1, role: UserRole = UserRole.MANAGER) -> Principal:
+    return Principal(
+        id=user_id,
+        email=f"user{user_id}@atlas.tld",
+        name=f"User {user_id}",
+        role=role,
+        is_active=True,
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def test_cache_hit_and_invalidate():
+    cache = PrincipalCache(ttl_seconds=60)
+
+    async def scenario():
+        await cache.set(make_principal())
+        assert (await cache.get(1)).role == UserRole.MANAGER
+        await cache.invalidate(1)
+        assert await cache.get(1) is None
+
+    asyncio.run(scenario())
+
+
+def test_cache_expiry_and_bound():
+    async def scenario():
+        expired = PrincipalCache(ttl_seconds=0.01)
+        await expired.set(make_principal())
+        await asyncio.sleep(0.02)
+        assert await expired.get(1) is None
+
+        bounded = PrincipalCache(ttl_seconds=60, max_size=2)
+        for uid in (1, 2, 3):
+            await bounded.set(make_principal(uid))
+        assert await bounded.get(1) is None
+        assert await bounded.get(3) is not None
+
+    asyncio.run(scenario())
+
+
+def test_disabled_cache():
+    cache = PrincipalCache(ttl_seconds=0)
+
+    async def scenario():
+        await cache.set(make_principal())
+        assert await cache.get(1) is None
+
+    asyncio.run(scenario())
+
+
+def test_principal_json_roundtrip():
+    principal = make_principal(role=UserRole.HEAD)
+    assert Principal.from_json(principal.to_json()) == principal
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from sqlalchemy import func, select
+from app.core.dedup import sipuni_events
+from app.models.activity import Activity, ActivityKind
+from app.models.call import Call
+from app.models.lead import Lead
+from app.services.sipuni_service import SipuniService
+from tests.conftest import requires_postgres
+
+
+class StubRepo:
+    def __init__(self, **methods):
+        self.calls = []
+        for name, result in methods.items():
+            setattr(self, name, self._recorder(name, result))
+
+    def _recorder(self, name, result):
+        async def method(*args, **kwargs):
+            self.calls.append(name)
+            return result
+        return method
+
+
+def handle(inserted: bool):
+    lead = SimpleNamespace(id=1, manager_id=None, last_activity_at=None)
+    call = SimpleNamespace(id=7, created_at=datetime.now(timezone.utc))
+    service = SipuniService(db=SimpleNamespace(sync_session=SimpleNamespace(info={})), http=object())
+    service.lead_repo = StubRepo(get_by_phone=lead, update=lead)
+    service.call_repo = StubRepo(upsert_from_webhook=(call, inserted))
+    service.activity_repo = StubRepo(create=None)
+    payload = {"event": "call_end", "call_id": f"c-{inserted}", "src_number": "+77001234567", "duration": 30}
+    assert asyncio.run(service.handle_webhook(payload)) is call
+    return service, lead
+
+
+def test_new_call_records_activity():
+    service, lead = handle(inserted=True)
+    assert service.activity_repo.calls == ["create"]
+    assert lead.last_activity_at is not None
+
+
+def test_completed_existing_call_adds_no_second_activity():
+    service, lead = handle(inserted=False)
+    assert service.activity_repo.calls == []
+    assert lead.last_activity_at is not None
+
+
+@requires_postgres
+def test_final_event_completes_the_stored_call_without_a_second_activity(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            lead = Lead(name="L", phone="+77001234567")
+            db.add(lead)
+            await db.commit()
+            service = SipuniService(db, http=object())
+            start = {"event": "call_start", "call_id": "c-merge", "src_number": lead.phone}
+            end = {**start, "event": "call_end", "duration": 42, "status": "answered"}
+            first = await service.handle_webhook(start)
+            await db.commit()
+            completed = await service.handle_webhook(end)
+            await db.commit()
+            # An unchanged redelivery that missed the in-memory LRU stops at the conditional upsert
+            sipuni_events.clear()
+            repeated = await service.handle_webhook(end)
+            calls = (await db.execute(select(Call.id, Call.duration, Call.result))).all()
+            activities = await db.scalar(select(func.count(Activity.id)).where(Activity.kind == ActivityKind.CALL))
+            return first.id == completed.id, repeated, [tuple(call) for call in calls], activities, first.id
+
+    same, repeated, calls, activities, call_id = run_db(scenario)
+    assert same and repeated is None
+    assert calls == [(call_id, 42, "answered")]
+    assert activities == 1
@@ -0,0 +1,22 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from app.models.lead import Lead
+from app.repositories.lead_repo import normalize_tag_filter, tag_conditions
+
+
+def test_normalize_tag_filter():
+    assert normalize_tag_filter(None) is None
+    assert normalize_tag_filter(["vip", " "]) == {"any": ["vip"]}
+    assert normalize_tag_filter({"any": "vip, hot", "all": None, "none": ["spam"]}) == {
+        "any": ["vip", "hot"],
+        "none": ["spam"],
+    }
+    assert normalize_tag_filter({"any": "", "all": None}) is None
+
+
+def test_tag_conditions_compile_to_jsonb_operators():
+    query = select(Lead.id).where(*tag_conditions({"any": ["vip"], "all": ["a", "b"], "none": ["spam"]}))
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "leads.tags ?| " in sql
+    assert "leads.tags ?& " in sql
+    assert "leads.tags IS NULL OR NOT (leads.tags ?| " in sql
@@ -0,0 +1,109 @@
+import asyncio
+import time
+import httpx
+from app.core.rate_limit import TokenBucket
+from app.services.whatsapp_sender import WhatsAppSender
+
+
+def make_sender(rate: float = 1000, burst: int = 1000) -> WhatsAppSender:
+    return WhatsAppSender(
+        TokenBucket("test", rate=rate, burst=burst), concurrency=2, max_attempts=3, backoff_base=0.01, backoff_max=0.05,
+    )
+
+
+def test_rate_limited_send_is_retried_after_pause():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.1"})
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+
+    async def scenario():
+        sender = make_sender()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            resp = await sender.send(http, {"to": "1"})
+        await sender.close()
+        return resp
+
+    resp = asyncio.run(scenario())
+    assert resp.status_code == 200
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.1
+
+
+def test_server_errors_give_up_after_max_attempts():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(503)
+
+    async def scenario():
+        sender = make_sender()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            resp = await sender.send(http, {"to": "1"})
+        await sender.close()
+        return resp
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert len(calls) == 3
+
+
+def test_only_unsent_transport_errors_are_retried():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        raise httpx.ReadTimeout("no answer", request=request)
+
+    async def scenario():
+        sender = make_sender()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            try:
+                await sender.send(http, {"to": "1"})
+            except httpx.ReadTimeout:
+                return True
+            finally:
+                await sender.close()
+
+    assert asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_local_bucket_paces_bursts():
+    async def scenario():
+        bucket = TokenBucket("test", rate=50, burst=1)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.09
+
+
+def test_close_fails_sends_waiting_for_a_retry():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(503, headers={"Retry-After": "60"})
+
+    async def scenario():
+        sender = make_sender()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            send = asyncio.create_task(sender.send(http, {"to": "1"}))
+            while not sender._retries:
+                await asyncio.sleep(0.01)
+            handles = list(sender._retries)
+            await sender.close()
+            try:
+                await asyncio.wait_for(send, timeout=1)
+            except RuntimeError as e:
+                return str(e), [handle.cancelled() for handle in handles], sender._retries
+
+    assert asyncio.run(scenario()) == ("WhatsApp sender closed", [True], {})
+    assert len(calls) == 1
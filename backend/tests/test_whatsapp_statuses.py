@@ -0,0 +1,40 @@
+import asyncio
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from app.models.message import MessageStatus
+from app.repositories.message_repo import MessageRepository
+from app.services.whatsapp_service import collapse_statuses
+
+
+def test_collapse_statuses_keeps_most_advanced():
+    statuses = [
+        {"id": "wamid.1", "status": "read"},
+        {"id": "wamid.1", "status": "delivered"},
+        {"id": "wamid.2", "status": "sent"},
+        {"id": "wamid.2", "status": "delivered"},
+        {"id": "wamid.3", "status": "deleted"},
+        {"status": "read"},
+    ]
+    assert collapse_statuses(statuses) == {
+        "wamid.1": MessageStatus.READ,
+        "wamid.2": MessageStatus.DELIVERED,
+    }
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(rowcount=0)
+
+
+def test_apply_statuses_compares_enum_names():
+    db = RecordingSession()
+    asyncio.run(MessageRepository(db).apply_statuses({"wamid.1": MessageStatus.READ}))
+
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    for status in MessageStatus:
+        assert f"messages.status = '{status.name}'" in sql
+        assert f"'{status.value}'" not in sql
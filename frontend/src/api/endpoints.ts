@@ -47,7 +47,13 @@ export const leadsApi = {
 
 export const messagesApi = {
   dialogs: () => api.get<Dialog[]>('/dialogs'),
-  byLead: (leadId: number) => api.get<Message[]>(`/leads/${leadId}/messages`),
+  // Newest first; page back with before_id, catch up with after_id
+  byLead: (leadId: number, params?: { before_id?: number; after_id?: number; limit?: number }) => {
+    const query = params ? '?' + new URLSearchParams(
+      Object.entries(params).filter(([, v]) => v !== undefined).map(([k, v]) => [k, String(v)])
+    ).toString() : '';
+    return api.get<Message[]>(`/leads/${leadId}/messages${query}`);
+  },
   send: (leadId: number, content: string, templateName?: string) =>
     api.post<Message>(`/leads/${leadId}/messages/send`, { content, template_name: templateName }),
 };
@@ -67,10 +73,13 @@ export const callsApi = {
 
 export const broadcastsApi = {
   list: () => api.get<Broadcast[]>('/broadcasts'),
-  create: (data: { name: string; segment?: Record<string, unknown>; template_name?: string; body: string }) =>
+  create: (data: { name: string; segment?: Record<string, unknown>; template_name?: string; body: string; concurrency?: number }) =>
     api.post<Broadcast>('/broadcasts', data),
   schedule: (id: number, scheduledAt?: string) =>
     api.post<Broadcast>(`/broadcasts/${id}/schedule`, { scheduled_at: scheduledAt }),
+  pause: (id: number) => api.post<Broadcast>(`/broadcasts/${id}/pause`),
+  resume: (id: number) => api.post<Broadcast>(`/broadcasts/${id}/resume`),
+  cancel: (id: number) => api.post<Broadcast>(`/broadcasts/${id}/cancel`),
 };
 
 export const distributionApi = {
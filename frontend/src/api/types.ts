@@ -94,7 +94,11 @@ export interface Broadcast {
   segment: Record<string, unknown> | null;
   template_name: string | null;
   body: string;
-  status: 'draft' | 'scheduled' | 'sending' | 'done';
+  concurrency: number | null;
+  total_count: number | null;
+  sent_count: number;
+  failed_count: number;
+  status: 'draft' | 'scheduled' | 'sending' | 'done' | 'paused' | 'cancelled';
   scheduled_at: string | null;
   created_by: number;
   created_at: string;
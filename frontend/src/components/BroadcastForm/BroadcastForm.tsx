@@ -5,6 +5,7 @@ import { useWSStore } from '../../store/wsStore';
 import {
   HiOutlinePaperAirplane, HiOutlineClock, HiOutlinePlus,
   HiOutlineXMark, HiOutlineMegaphone, HiOutlineCheckCircle,
+  HiOutlinePause, HiOutlinePlay, HiOutlineStop,
 } from 'react-icons/hi2';
 import toast from 'react-hot-toast';
 
@@ -13,6 +14,8 @@ const statusMap: Record<string, { class: string; icon: React.ReactNode }> = {
   scheduled: { class: 'badge-yellow', icon: <HiOutlineClock size={12} /> },
   sending:   { class: 'badge-blue',   icon: <span className="w-1.5 h-1.5 rounded-full bg-blue-500 animate-pulse" /> },
   done:      { class: 'badge-green',  icon: <HiOutlineCheckCircle size={12} /> },
+  paused:    { class: 'badge-yellow', icon: <HiOutlinePause size={12} /> },
+  cancelled: { class: 'badge-gray',   icon: <HiOutlineXMark size={12} /> },
 };
 
 export default function BroadcastForm() {
@@ -38,7 +41,11 @@ export default function BroadcastForm() {
   useEffect(() => { fetchBroadcasts(); }, []);
 
   useEffect(() => {
-    if (lastEvent?.event === 'broadcast:progress') fetchBroadcasts();
+    if (lastEvent?.event === 'broadcast:progress') {
+      const { broadcast_id, sent, failed } = lastEvent.data as { broadcast_id: number; sent: number; failed: number };
+      setBroadcasts((prev) => prev.map((bc) => (bc.id === broadcast_id ? { ...bc, sent_count: sent, failed_count: failed } : bc)));
+    }
+    if (lastEvent?.event === 'broadcast:finished') fetchBroadcasts();
   }, [lastEvent]);
 
   const resetForm = () => {
@@ -77,6 +84,16 @@ export default function BroadcastForm() {
     }
   };
 
+  const handleControl = async (action: 'pause' | 'resume' | 'cancel', id: number) => {
+    try {
+      await broadcastsApi[action](id);
+      toast.success({ pause: 'Рассылка приостановлена', resume: 'Рассылка возобновлена', cancel: 'Рассылка отменена' }[action]);
+      fetchBroadcasts();
+    } catch (e: any) {
+      toast.error(e.message);
+    }
+  };
+
   // Stats
   const total = broadcasts.length;
   const drafts = broadcasts.filter((b) => b.status === 'draft').length;
@@ -202,6 +219,12 @@ export default function BroadcastForm() {
                         Сегмент: {Object.entries(bc.segment).map(([k, v]) => `${k}=${String(v)}`).join(', ')}
                       </span>
                     )}
+                    {bc.total_count != null && (
+                      <span className="text-[11px] text-gray-500">
+                        Отправлено {bc.sent_count} из {bc.total_count}
+                        {bc.failed_count > 0 && <span className="text-red-500"> · ошибок {bc.failed_count}</span>}
+                      </span>
+                    )}
                     {bc.scheduled_at && (
                       <span className="text-[11px] text-amber-600 flex items-center gap-1">
                         <HiOutlineClock size={11} />
@@ -241,8 +264,30 @@ export default function BroadcastForm() {
                   <div className="flex items-center gap-2 text-blue-600 text-xs flex-shrink-0">
                     <div className="w-4 h-4 border-2 border-blue-600 border-t-transparent rounded-full animate-spin" />
                     Отправка...
+                    <button onClick={() => handleControl('pause', bc.id)} className="btn-secondary text-xs p-2" title="Приостановить">
+                      <HiOutlinePause size={14} />
+                    </button>
                   </div>
                 )}
+
+                {bc.status === 'paused' && (
+                  <button
+                    onClick={() => handleControl('resume', bc.id)}
+                    className="btn-primary text-xs px-3 py-2 flex items-center gap-1.5 flex-shrink-0"
+                  >
+                    <HiOutlinePlay size={13} /> Продолжить
+                  </button>
+                )}
+
+                {['scheduled', 'sending', 'paused'].includes(bc.status) && (
+                  <button
+                    onClick={() => handleControl('cancel', bc.id)}
+                    className="btn-secondary text-xs p-2 flex-shrink-0"
+                    title="Отменить"
+                  >
+                    <HiOutlineStop size={14} />
+                  </button>
+                )}
               </div>
             </div>
           ))}
@@ -21,6 +21,8 @@ const TEMPLATES = [
   { name: 'confirm', label: 'Подтверждение', text: 'Ваша бронь подтверждена! Детали поездки отправим в ближайшее время. Если есть вопросы — пишите.' },
 ];
 
+const PAGE_SIZE = 50;
+
 interface TimelineItem {
   type: 'message' | 'call';
   timestamp: string;
@@ -36,13 +38,31 @@ export default function ChatView({ leadId }: Props) {
   const [showTemplates, setShowTemplates] = useState(false);
   const [sending, setSending] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [hasOlder, setHasOlder] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const messagesEnd = useRef<HTMLDivElement>(null);
+  const skipScroll = useRef(false);
   const inputRef = useRef<HTMLInputElement>(null);
   const lastEvent = useWSStore((s) => s.lastEvent);
 
-  const fetchData = () => {
+  const mergeMessages = (incoming: Message[]) =>
+    setMessages((prev) => {
+      const byId = new Map(prev.map((m) => [m.id, m]));
+      incoming.forEach((m) => byId.set(m.id, m));
+      return Array.from(byId.values());
+    });
+
+  // The latest page is merged in, so history already paged back stays loaded
+  const fetchData = (reset = false) => {
     Promise.all([
-      messagesApi.byLead(leadId).then(setMessages),
+      messagesApi.byLead(leadId, { limit: PAGE_SIZE }).then((page) => {
+        if (reset) {
+          setMessages(page);
+          setHasOlder(page.length === PAGE_SIZE);
+        } else {
+          mergeMessages(page);
+        }
+      }),
       leadsApi.get(leadId).then(setLead),
       callsApi.byLead(leadId).then(setCalls),
     ]).catch(() => {}).finally(() => setLoading(false));
@@ -50,7 +70,7 @@ export default function ChatView({ leadId }: Props) {
 
   useEffect(() => {
     setLoading(true);
-    fetchData();
+    fetchData(true);
     inputRef.current?.focus();
   }, [leadId]);
 
@@ -63,9 +83,29 @@ export default function ChatView({ leadId }: Props) {
   }, [lastEvent]);
 
   useEffect(() => {
+    if (skipScroll.current) {
+      skipScroll.current = false;
+      return;
+    }
     messagesEnd.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages, calls]);
 
+  const loadOlder = async () => {
+    if (!messages.length || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const oldest = messages.reduce((a, b) => (new Date(b.created_at) < new Date(a.created_at) ? b : a));
+      const page = await messagesApi.byLead(leadId, { before_id: oldest.id, limit: PAGE_SIZE });
+      skipScroll.current = true;
+      mergeMessages(page);
+      setHasOlder(page.length === PAGE_SIZE);
+    } catch (e: any) {
+      toast.error(e.message);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const handleSend = async () => {
     if (!text.trim() || sending) return;
     setSending(true);
@@ -149,6 +189,13 @@ export default function ChatView({ leadId }: Props) {
 
       {/* Timeline area */}
       <div className="flex-1 overflow-y-auto px-5 py-4 scrollbar-thin">
+        {!loading && hasOlder && (
+          <div className="flex justify-center mb-2">
+            <button onClick={loadOlder} disabled={loadingOlder} className="text-[11px] text-primary-600 hover:underline disabled:opacity-50">
+              {loadingOlder ? 'Загрузка...' : 'Показать более ранние сообщения'}
+            </button>
+          </div>
+        )}
         {loading ? (
           <div className="space-y-4 py-4">
             {[1,2,3].map((i) => (